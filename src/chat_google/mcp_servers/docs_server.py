@@ -1,21 +1,72 @@
+import asyncio
+import importlib.util
 import os
-from datetime import datetime, timedelta, timezone
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
+from types import MappingProxyType
 
 import httpx
-from dotenv import load_dotenv
+import orjson
+from dotenv import find_dotenv, load_dotenv
 from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 load_dotenv()
-mcp = FastMCP("GoogleDocs")
+
+
+@asynccontextmanager
+async def _lifespan(_server: FastMCP):
+    try:
+        yield
+    finally:
+        await _close_http_client()
+
+
+mcp = FastMCP("GoogleDocs", lifespan=_lifespan)
 
 DOCS_API_BASE = "https://docs.googleapis.com/v1"
 DRIVE_API_BASE = "https://www.googleapis.com/drive/v3"
 GOOGLE_OAUTH_TOKEN_ENDPOINT = "https://oauth2.googleapis.com/token"
 HTTP_TIMEOUT = httpx.Timeout(timeout=20.0, connect=5.0)
+HTTP_LIMITS = httpx.Limits(
+    max_connections=40,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0,
+)
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
 GOOGLE_DOC_MIME = "application/vnd.google-apps.document"
 TOKEN_EXPIRY_SAFETY_MARGIN_SECONDS = 60
-DOC_SHARE_ROLES = {"reader", "commenter", "writer"}
+TOKEN_EXPIRY_JITTER_MAX_SECONDS = 30
+LIST_CACHE_TTL_SECONDS = 30
+LIST_CACHE_MAX_ENTRIES = 64
+INSERT_INDEX_CACHE_TTL_SECONDS = 30
+INSERT_INDEX_CACHE_MAX_ENTRIES = 256
+FILE_LINK_CACHE_TTL_SECONDS = 300
+FILE_LINK_CACHE_MAX_ENTRIES = 256
+# 429 and 5xx from Google are usually momentary. GETs are retried on all of them; writes only
+# on 429, which Google guarantees was not applied (a 5xx insertText may already have landed).
+TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Docs answers a batchUpdate whose writeControl revision is stale with 400 and applies nothing.
+REVISION_MISMATCH_STATUS = 400
+HTTP_MAX_RETRIES = 3
+HTTP_RETRY_BASE_DELAY_SECONDS = 0.5
+HTTP_RETRY_MAX_DELAY_SECONDS = 4.0
+# Concurrent tool calls share one Drive per-user write quota; cap writes in flight so a
+# client fanning out appends/shares queues here instead of collecting 429s.
+WRITE_CONCURRENCY_LIMIT = 8
+LIST_LIMIT_MIN = 1
+LIST_LIMIT_MAX = 100
+AUTH_ERROR_HINT = (
+    " Hint: access token expired/invalid. Configure refresh flow with "
+    "GOOGLE_DRIVE_REFRESH_TOKEN, GOOGLE_OAUTH_CLIENT_ID, GOOGLE_OAUTH_CLIENT_SECRET."
+)
+DOCS_FORBIDDEN_HINT = (
+    " Hint: ensure Google Docs API is enabled and token scope allows Docs/Drive access."
+)
+DOC_SHARE_ROLES = frozenset({"reader", "commenter", "writer"})
 DOC_EXPORT_FORMATS = {
     "txt": "text/plain",
     "html": "text/html",
@@ -23,12 +74,58 @@ DOC_EXPORT_FORMATS = {
     "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
 }
 
+_ALLOWED_SHARE_ROLES_TEXT = ", ".join(sorted(DOC_SHARE_ROLES))
+_ALLOWED_EXPORT_FORMATS_TEXT = ", ".join(sorted(DOC_EXPORT_FORMATS))
+_DOCS_LIST_QUERY = f"mimeType='{GOOGLE_DOC_MIME}' and trashed=false"
+_DRIVE_LIST_FIELDS = "files(id,name,modifiedTime,webViewLink)"
+_DRIVE_LIST_BASE_PARAMS = MappingProxyType(
+    {
+        "orderBy": "modifiedTime desc",
+        "fields": _DRIVE_LIST_FIELDS,
+        "supportsAllDrives": "true",
+        "includeItemsFromAllDrives": "true",
+    }
+)
+_DRIVE_DOC_METADATA_PARAMS = MappingProxyType(
+    {
+        "fields": "id,name,modifiedTime,owners(displayName,emailAddress),webViewLink",
+        "supportsAllDrives": "true",
+    }
+)
+_DRIVE_FILE_LINK_PARAMS = MappingProxyType(
+    {"fields": "id,name,webViewLink", "supportsAllDrives": "true"}
+)
+
+# Partial-response masks for documents.get: each tool asks only for the fields it reads
+# instead of the full body with styles, which is most of a large document's payload.
+_DOC_METADATA_PARAMS = MappingProxyType({"fields": "documentId,title,revisionId"})
+_DOC_TEXT_PARAMS = MappingProxyType(
+    {"fields": "title,body(content(paragraph(elements(textRun(content)))))"}
+)
+_DOC_INSERT_INDEX_PARAMS = MappingProxyType({"fields": "body(content(endIndex))"})
+_DOC_REVISION_PARAMS = MappingProxyType({"fields": "revisionId"})
+_EMPTY: Mapping = MappingProxyType({})
+_JSON_CONTENT_HEADERS = MappingProxyType({"Content-Type": "application/json"})
+
 _CACHED_ACCESS_TOKEN: str | None = None
-_CACHED_ACCESS_TOKEN_EXPIRES_AT: datetime | None = None
+_CACHED_ACCESS_TOKEN_EXPIRES_AT: float | None = None
+_REFRESH_LOCK = asyncio.Lock()
+_WRITE_SEMAPHORE = asyncio.Semaphore(WRITE_CONCURRENCY_LIMIT)
+_HTTP_CLIENT: httpx.AsyncClient | None = None
+_DOTENV_PATH: str | None = None
+_DOTENV_MTIME: float | None = None
+_REFRESH_PAYLOAD_BASE: dict[str, str] | None = None
+_ENV_CREDENTIALS: tuple[str, str, str, str] | None = None
+_CACHED_AUTH_HEADERS: dict[str, str] | None = None
+_LIST_CACHE: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+# document_id -> (expires_at, revision_id, insert_index) after this process's last append.
+_INSERT_INDEX_CACHE: dict[str, tuple[float, str, int]] = {}
+# document_id -> (expires_at, {"name", "webViewLink"}) for export/share output.
+_FILE_LINK_CACHE: OrderedDict[str, tuple[float, dict]] = OrderedDict()
 
 
 class _ListDocsInput(BaseModel):
-    limit: int = Field(default=10, ge=1, le=100, strict=True)
+    limit: int = Field(default=10, ge=LIST_LIMIT_MIN, le=LIST_LIMIT_MAX, strict=True)
 
 
 class _SearchDocsInput(BaseModel):
@@ -125,47 +222,98 @@ class _ReplaceTextIfRevisionInput(BaseModel):
 
 
 def _get_cached_access_token() -> str | None:
-    global _CACHED_ACCESS_TOKEN, _CACHED_ACCESS_TOKEN_EXPIRES_AT
-    if not _CACHED_ACCESS_TOKEN or not _CACHED_ACCESS_TOKEN_EXPIRES_AT:
+    if not _CACHED_ACCESS_TOKEN or _CACHED_ACCESS_TOKEN_EXPIRES_AT is None:
         return None
-    if datetime.now(timezone.utc) >= _CACHED_ACCESS_TOKEN_EXPIRES_AT:
-        _CACHED_ACCESS_TOKEN = None
-        _CACHED_ACCESS_TOKEN_EXPIRES_AT = None
+    if time.monotonic() >= _CACHED_ACCESS_TOKEN_EXPIRES_AT:
+        _invalidate_cached_access_token()
         return None
     return _CACHED_ACCESS_TOKEN
 
 
 def _invalidate_cached_access_token() -> None:
-    global _CACHED_ACCESS_TOKEN, _CACHED_ACCESS_TOKEN_EXPIRES_AT
+    global _CACHED_ACCESS_TOKEN, _CACHED_ACCESS_TOKEN_EXPIRES_AT, _CACHED_AUTH_HEADERS
     _CACHED_ACCESS_TOKEN = None
     _CACHED_ACCESS_TOKEN_EXPIRES_AT = None
+    _CACHED_AUTH_HEADERS = None
 
 
 def _set_cached_access_token(token: str, expires_in_seconds: int) -> None:
     global _CACHED_ACCESS_TOKEN, _CACHED_ACCESS_TOKEN_EXPIRES_AT
-    safe_ttl = max(0, int(expires_in_seconds) - TOKEN_EXPIRY_SAFETY_MARGIN_SECONDS)
+    # Jitter spreads expiry so parallel tool calls do not all refresh at the same instant.
+    safe_ttl = max(
+        0,
+        int(expires_in_seconds)
+        - TOKEN_EXPIRY_SAFETY_MARGIN_SECONDS
+        - random.randint(0, TOKEN_EXPIRY_JITTER_MAX_SECONDS),
+    )
     _CACHED_ACCESS_TOKEN = token
-    _CACHED_ACCESS_TOKEN_EXPIRES_AT = datetime.now(timezone.utc) + timedelta(seconds=safe_ttl)
+    _CACHED_ACCESS_TOKEN_EXPIRES_AT = time.monotonic() + safe_ttl
 
 
-def _refresh_access_token(
+async def _reload_dotenv_if_changed() -> None:
+    global _DOTENV_PATH, _DOTENV_MTIME, _REFRESH_PAYLOAD_BASE, _ENV_CREDENTIALS
+    if _DOTENV_PATH is None:
+        _DOTENV_PATH = find_dotenv()
+    if not _DOTENV_PATH:
+        return
+    try:
+        mtime = os.stat(_DOTENV_PATH).st_mtime
+    except OSError:
+        return
+    if mtime == _DOTENV_MTIME:
+        return
+    # Parsing .env is file I/O; keep it off the event loop so concurrent tool calls proceed.
+    await asyncio.to_thread(load_dotenv, _DOTENV_PATH, override=True)
+    _DOTENV_MTIME = mtime
+    _REFRESH_PAYLOAD_BASE = None
+    _ENV_CREDENTIALS = None
+    # The credentials may now belong to another account; its listings must not be served
+    # from the previous account's cache.
+    _LIST_CACHE.clear()
+
+
+def _env_credentials() -> tuple[str, str, str, str]:
+    """Returns (static_token, refresh_token, client_id, client_secret) from the environment."""
+    global _ENV_CREDENTIALS
+    if _ENV_CREDENTIALS is None:
+        _ENV_CREDENTIALS = (
+            (os.getenv("GOOGLE_DRIVE_ACCESS_TOKEN") or "").strip(),
+            (os.getenv("GOOGLE_DRIVE_REFRESH_TOKEN") or "").strip(),
+            (os.getenv("GOOGLE_OAUTH_CLIENT_ID") or "").strip(),
+            (os.getenv("GOOGLE_OAUTH_CLIENT_SECRET") or "").strip(),
+        )
+    return _ENV_CREDENTIALS
+
+
+def _refresh_payload_base(client_id: str, client_secret: str) -> dict[str, str]:
+    global _REFRESH_PAYLOAD_BASE
+    base = _REFRESH_PAYLOAD_BASE
+    if (
+        base is None
+        or base["client_id"] != client_id
+        or base["client_secret"] != client_secret
+    ):
+        base = {
+            "grant_type": "refresh_token",
+            "client_id": client_id,
+            "client_secret": client_secret,
+        }
+        _REFRESH_PAYLOAD_BASE = base
+    return base
+
+
+async def _refresh_access_token(
     refresh_token: str,
     client_id: str,
     client_secret: str,
 ) -> tuple[str, int]:
-    payload = {
-        "grant_type": "refresh_token",
-        "refresh_token": refresh_token,
-        "client_id": client_id,
-        "client_secret": client_secret,
-    }
-    with httpx.Client(**_client_kwargs()) as client:
-        response = client.post(GOOGLE_OAUTH_TOKEN_ENDPOINT, data=payload)
+    payload = {**_refresh_payload_base(client_id, client_secret), "refresh_token": refresh_token}
+    response = await _get_http_client().post(GOOGLE_OAUTH_TOKEN_ENDPOINT, data=payload)
 
     if response.status_code != 200:
         detail = ""
         try:
-            body = response.json()
+            body = orjson.loads(response.content)
             error = body.get("error", "")
             error_description = body.get("error_description", "")
             detail = f"{error}: {error_description}".strip(": ").strip()
@@ -177,7 +325,7 @@ def _refresh_access_token(
         )
 
     try:
-        data = response.json()
+        data = orjson.loads(response.content)
     except Exception as exc:
         raise ValueError(f"Docs OAuth refresh response parse error: {exc}") from exc
 
@@ -193,31 +341,41 @@ def _refresh_access_token(
     return token, expires_in
 
 
-def _get_access_token() -> str:
-    # Reload .env so token rotation scripts can update running MCP processes without restart.
-    load_dotenv(override=True)
+async def _get_access_token() -> str:
+    # Reload .env when it changes so token rotation scripts can update running MCP processes
+    # without restart.
+    await _reload_dotenv_if_changed()
 
     cached = _get_cached_access_token()
     if cached:
         return cached
 
-    static_token = (os.getenv("GOOGLE_DRIVE_ACCESS_TOKEN") or "").strip()
-    refresh_token = (os.getenv("GOOGLE_DRIVE_REFRESH_TOKEN") or "").strip()
-    client_id = (os.getenv("GOOGLE_OAUTH_CLIENT_ID") or "").strip()
-    client_secret = (os.getenv("GOOGLE_OAUTH_CLIENT_SECRET") or "").strip()
+    async with _REFRESH_LOCK:
+        # Another task may have refreshed the token while this one waited for the lock.
+        cached = _get_cached_access_token()
+        if cached:
+            return cached
+        return await _resolve_access_token()
+
+
+async def _resolve_access_token() -> str:
+    global _ENV_CREDENTIALS
+    # Cached until .env changes; a static-token setup hits this on every request.
+    static_token, refresh_token, client_id, client_secret = _env_credentials()
 
     has_any_refresh_inputs = any([refresh_token, client_id, client_secret])
     has_full_refresh_inputs = all([refresh_token, client_id, client_secret])
 
     if has_full_refresh_inputs:
         try:
-            refreshed_token, expires_in = _refresh_access_token(
+            refreshed_token, expires_in = await _refresh_access_token(
                 refresh_token=refresh_token,
                 client_id=client_id,
                 client_secret=client_secret,
             )
             _set_cached_access_token(refreshed_token, expires_in)
             os.environ["GOOGLE_DRIVE_ACCESS_TOKEN"] = refreshed_token
+            _ENV_CREDENTIALS = None
             return refreshed_token
         except Exception as exc:
             if static_token:
@@ -248,23 +406,58 @@ def _get_access_token() -> str:
 
 
 def _client_kwargs() -> dict:
-    return {"follow_redirects": True, "timeout": HTTP_TIMEOUT}
+    return {
+        "follow_redirects": True,
+        "timeout": HTTP_TIMEOUT,
+        "limits": HTTP_LIMITS,
+        "http2": HTTP2_ENABLED,
+    }
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(**_client_kwargs())
+    return _HTTP_CLIENT
+
+
+async def _close_http_client() -> None:
+    global _HTTP_CLIENT
+    client = _HTTP_CLIENT
+    _HTTP_CLIENT = None
+    if client is not None and not client.is_closed:
+        await client.aclose()
 
 
 def _auth_headers(token: str) -> dict:
-    return {"Authorization": f"Bearer {token}"}
+    # The token only changes on refresh, so reuse one header dict per token.
+    # Callers must treat the returned dict as read-only.
+    global _CACHED_AUTH_HEADERS
+    authorization = f"Bearer {token}"
+    headers = _CACHED_AUTH_HEADERS
+    if headers is None or headers["Authorization"] != authorization:
+        headers = {"Authorization": authorization}
+        _CACHED_AUTH_HEADERS = headers
+    return headers
+
+
+def _request_headers(token: str, extra_headers: Mapping[str, str] | None = None) -> dict:
+    if not extra_headers:
+        return _auth_headers(token)
+    return {**_auth_headers(token), **extra_headers}
 
 
 def _escape_query(value: str) -> str:
     return value.replace("\\", "\\\\").replace("'", "\\'")
 
 
-def _format_docs_error(response: httpx.Response) -> str:
+def _format_api_error(response: httpx.Response, api_name: str) -> str:
     status = response.status_code
+    raw = response.content
     detail = ""
     reason = ""
     try:
-        payload = response.json()
+        payload = orjson.loads(raw)
         error_obj = payload.get("error", {}) if isinstance(payload, dict) else {}
         detail = str(error_obj.get("message", "")).strip()
         errors = error_obj.get("errors", []) if isinstance(error_obj, dict) else []
@@ -273,61 +466,51 @@ def _format_docs_error(response: httpx.Response) -> str:
             if isinstance(first, dict):
                 reason = str(first.get("reason", "")).strip()
     except Exception:
-        detail = response.text.strip()[:300]
+        detail = raw.strip()[:300].decode("utf-8", errors="replace")
     detail_part = f" - {detail}" if detail else ""
     hint = ""
     if status == 401:
-        hint = (
-            " Hint: access token expired/invalid. Configure refresh flow with "
-            "GOOGLE_DRIVE_REFRESH_TOKEN, GOOGLE_OAUTH_CLIENT_ID, GOOGLE_OAUTH_CLIENT_SECRET."
-        )
-    elif status == 403:
-        hint = (
-            " Hint: ensure Google Docs API is enabled and token scope allows Docs/Drive access."
-        )
+        hint = AUTH_ERROR_HINT
+    elif status == 403 and api_name == "Google Docs":
+        hint = DOCS_FORBIDDEN_HINT
     reason_part = f" ({reason})" if reason else ""
-    return f"Error: Google Docs API request failed: {status}{reason_part}{detail_part}.{hint}".strip()
+    return f"Error: {api_name} API request failed: {status}{reason_part}{detail_part}.{hint}".strip()
 
 
-def _format_drive_error(response: httpx.Response) -> str:
-    status = response.status_code
-    detail = ""
-    reason = ""
-    try:
-        payload = response.json()
-        error_obj = payload.get("error", {}) if isinstance(payload, dict) else {}
-        detail = str(error_obj.get("message", "")).strip()
-        errors = error_obj.get("errors", []) if isinstance(error_obj, dict) else []
-        if isinstance(errors, list) and errors:
-            first = errors[0]
-            if isinstance(first, dict):
-                reason = str(first.get("reason", "")).strip()
-    except Exception:
-        detail = response.text.strip()[:300]
-    detail_part = f" - {detail}" if detail else ""
-    hint = ""
-    if status == 401:
-        hint = (
-            " Hint: access token expired/invalid. Configure refresh flow with "
-            "GOOGLE_DRIVE_REFRESH_TOKEN, GOOGLE_OAUTH_CLIENT_ID, GOOGLE_OAUTH_CLIENT_SECRET."
-        )
-    reason_part = f" ({reason})" if reason else ""
-    return f"Error: Drive API request failed: {status}{reason_part}{detail_part}.{hint}".strip()
+def _iter_text_runs(document: dict):
+    # Docs API bodies follow a fixed schema, so skip per-element isinstance checks and
+    # fall back to a shared empty mapping for missing keys.
+    for block in document.get("body", _EMPTY).get("content", ()):
+        for element in block.get("paragraph", _EMPTY).get("elements", ()):
+            text = element.get("textRun", _EMPTY).get("content")
+            if text:
+                yield text
 
 
-def _extract_document_text(document: dict) -> str:
-    body = document.get("body", {})
-    content_blocks = body.get("content", []) if isinstance(body, dict) else []
+def _extract_document_text(
+    document: dict, max_chars: int | None = None
+) -> tuple[str, bool]:
     chunks: list[str] = []
-    for block in content_blocks:
-        paragraph = block.get("paragraph", {}) if isinstance(block, dict) else {}
-        elements = paragraph.get("elements", []) if isinstance(paragraph, dict) else []
-        for element in elements:
-            text_run = element.get("textRun", {}) if isinstance(element, dict) else {}
-            text = text_run.get("content", "") if isinstance(text_run, dict) else ""
-            if text:
-                chunks.append(text)
-    return "".join(chunks).strip()
+    length = 0
+    # Length of the collected text up to its last non-whitespace character,
+    # i.e. the length the result will have after strip().
+    content_length = 0
+    # _iter_text_runs is lazy, so breaking out early leaves the rest of the
+    # document body unvisited.
+    for text in _iter_text_runs(document):
+        if not chunks:
+            text = text.lstrip()
+            if not text:
+                continue
+        chunks.append(text)
+        length += len(text)
+        stripped = text.rstrip()
+        if stripped:
+            content_length = length - (len(text) - len(stripped))
+        if max_chars is not None and content_length > max_chars:
+            # The joined text is at most max_chars plus one run, never the whole document.
+            return "".join(chunks)[:max_chars].rstrip(), True
+    return "".join(chunks).strip(), False
 
 
 def _document_insert_index(document: dict) -> int:
@@ -345,102 +528,224 @@ def _document_insert_index(document: dict) -> int:
     return max(1, end_index - 1)
 
 
+def _remember_insert_index(
+    document_id: str, update_reply: dict | None, index: int, text: str
+) -> None:
+    write_control = (update_reply or _EMPTY).get("writeControl") or _EMPTY
+    revision_id = write_control.get("requiredRevisionId")
+    if not revision_id:
+        return
+    if len(_INSERT_INDEX_CACHE) >= INSERT_INDEX_CACHE_MAX_ENTRIES:
+        _INSERT_INDEX_CACHE.pop(next(iter(_INSERT_INDEX_CACHE)))
+    # Docs indexes count UTF-16 code units, not Python code points.
+    next_index = index + len(text.encode("utf-16-le")) // 2
+    _INSERT_INDEX_CACHE[document_id] = (
+        time.monotonic() + INSERT_INDEX_CACHE_TTL_SECONDS,
+        revision_id,
+        next_index,
+    )
+
+
+def _insert_text_body(index: int, text: str, required_revision_id: str | None = None) -> dict:
+    body: dict = {"requests": [{"insertText": {"location": {"index": index}, "text": text}}]}
+    if required_revision_id:
+        body["writeControl"] = {"requiredRevisionId": required_revision_id}
+    return body
+
+
+def _replace_all_text_body(
+    find_text: str,
+    replace_text: str,
+    match_case: bool,
+    required_revision_id: str | None = None,
+) -> dict:
+    body: dict = {
+        "requests": [
+            {
+                "replaceAllText": {
+                    "containsText": {"text": find_text, "matchCase": match_case},
+                    "replaceText": replace_text,
+                }
+            }
+        ]
+    }
+    if required_revision_id:
+        body["writeControl"] = {"requiredRevisionId": required_revision_id}
+    return body
+
+
+def _occurrences_changed(update_reply: dict | None) -> int:
+    replies = (update_reply or _EMPTY).get("replies") or ()
+    if not replies or not isinstance(replies[0], dict):
+        return 0
+    replace_resp = replies[0].get("replaceAllText", _EMPTY)
+    if not isinstance(replace_resp, dict):
+        return 0
+    return int(replace_resp.get("occurrencesChanged", 0))
+
+
+async def _append_to_document(document_id: str, text: str) -> tuple[int | None, str | None]:
+    """Inserts text at the end of the body and returns the index it was inserted at."""
+    update_path = f"/documents/{document_id}:batchUpdate"
+    cached = _INSERT_INDEX_CACHE.pop(document_id, None)
+    if cached is not None and time.monotonic() < cached[0]:
+        _, revision_id, index = cached
+        # Back-to-back appends skip the documents.get: the index left by our previous append
+        # is only valid if nobody edited since, which requiredRevisionId makes Docs enforce.
+        data, status, err = await _docs_post_with_status(
+            update_path, json_body=_insert_text_body(index, text, revision_id)
+        )
+        if not err:
+            _remember_insert_index(document_id, data, index, text)
+            return index, None
+        # Only a 400 means Docs rejected the stale revision without writing anything. After
+        # a 5xx the insert may have landed, so inserting again could duplicate the text.
+        if status != REVISION_MISMATCH_STATUS:
+            return None, err
+
+    doc_data, err = await _docs_get(f"/documents/{document_id}", params=_DOC_INSERT_INDEX_PARAMS)
+    if err:
+        return None, err
+    index = _document_insert_index(doc_data)
+    data, err = await _docs_post(update_path, json_body=_insert_text_body(index, text))
+    if err:
+        return None, err
+    _remember_insert_index(document_id, data, index, text)
+    return index, None
+
+
 def _normalize_share_role(role: str) -> tuple[str | None, str | None]:
     lowered = role.lower().strip()
     if lowered not in DOC_SHARE_ROLES:
-        return None, f"Invalid role '{role}'. Allowed roles: {', '.join(sorted(DOC_SHARE_ROLES))}"
+        return None, f"Invalid role '{role}'. Allowed roles: {_ALLOWED_SHARE_ROLES_TEXT}"
     return lowered, None
 
 
 def _normalize_export_format(export_format: str) -> tuple[str | None, str | None]:
-    normalized = export_format.lower().strip()
-    mime_type = DOC_EXPORT_FORMATS.get(normalized)
+    mime_type = DOC_EXPORT_FORMATS.get(export_format.lower().strip())
     if not mime_type:
         return None, (
-            f"Invalid export_format '{export_format}'. "
-            f"Allowed: {', '.join(sorted(DOC_EXPORT_FORMATS))}"
+            f"Invalid export_format '{export_format}'. Allowed: {_ALLOWED_EXPORT_FORMATS_TEXT}"
         )
     return mime_type, None
 
 
 def _build_structured_append_text(params: _AppendStructuredContentInput) -> str:
-    lines: list[str] = []
-    heading = params.heading.strip()
-    if heading:
-        lines.append(heading)
-        lines.append("")
-
-    paragraph = params.paragraph.strip()
-    if paragraph:
-        lines.append(paragraph)
-        lines.append("")
-
-    bullet_lines = [str(item).strip() for item in params.bullet_items if str(item).strip()]
-    for item in bullet_lines:
-        lines.append(f"- {item}")
-    if bullet_lines:
-        lines.append("")
-
-    numbered_lines = [str(item).strip() for item in params.numbered_items if str(item).strip()]
-    for idx, item in enumerate(numbered_lines, start=1):
-        lines.append(f"{idx}. {item}")
-
-    text = "\n".join(lines).rstrip()
+    bullet_lines = [stripped for item in params.bullet_items if (stripped := item.strip())]
+    numbered_lines = [stripped for item in params.numbered_items if (stripped := item.strip())]
+    sections = (
+        params.heading.strip(),
+        params.paragraph.strip(),
+        "\n".join(f"- {item}" for item in bullet_lines),
+        "\n".join(f"{idx}. {item}" for idx, item in enumerate(numbered_lines, start=1)),
+    )
+    text = "\n\n".join(section for section in sections if section)
     if not text:
         return ""
     return "\n\n" + text
 
 
-async def _docs_get(path: str) -> tuple[dict | None, str | None]:
-    token = _get_access_token()
-    url = f"{DOCS_API_BASE}{path}"
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.get(url, headers=_auth_headers(token))
-        if response.status_code == 401:
+def _is_retryable_status(method: str, status_code: int) -> bool:
+    if status_code == 429:
+        return True
+    return method == "GET" and status_code in TRANSIENT_STATUS_CODES
+
+
+def _retry_delay(attempt: int) -> float:
+    # Full jitter keeps concurrent tool calls that hit the same 429 from retrying in lockstep.
+    ceiling = HTTP_RETRY_BASE_DELAY_SECONDS * (2 ** (attempt - 1))
+    return random.uniform(0, min(HTTP_RETRY_MAX_DELAY_SECONDS, ceiling))
+
+
+async def _authed_request(
+    method: str,
+    url: str,
+    headers: Mapping[str, str] | None = None,
+    **kwargs,
+) -> httpx.Response:
+    response = await _send_authed(method, url, headers, **kwargs)
+    attempt = 0
+    while attempt < HTTP_MAX_RETRIES and _is_retryable_status(method, response.status_code):
+        attempt += 1
+        await asyncio.sleep(_retry_delay(attempt))
+        response = await _send_authed(method, url, headers, **kwargs)
+    return response
+
+
+async def _send_authed(
+    method: str,
+    url: str,
+    headers: Mapping[str, str] | None = None,
+    **kwargs,
+) -> httpx.Response:
+    client = _get_http_client()
+    token = await _get_access_token()
+    response = await client.request(method, url, headers=_request_headers(token, headers), **kwargs)
+    if response.status_code != 401:
+        return response
+
+    await _discard_rejected_token(token)
+    retry_token = await _get_access_token()
+    if retry_token:
+        response = await client.request(
+            method, url, headers=_request_headers(retry_token, headers), **kwargs
+        )
+    return response
+
+
+async def _discard_rejected_token(token: str) -> None:
+    async with _REFRESH_LOCK:
+        # Drop the rejected token unless a concurrent request has already replaced it,
+        # so a burst of 401s results in a single refresh.
+        if _get_cached_access_token() == token:
             _invalidate_cached_access_token()
-            retry_token = _get_access_token()
-            if retry_token:
-                response = await client.get(url, headers=_auth_headers(retry_token))
+
+
+async def _docs_get(
+    path: str, params: Mapping[str, str] | None = None
+) -> tuple[dict | None, str | None]:
+    response = await _authed_request("GET", f"{DOCS_API_BASE}{path}", params=params)
     if response.status_code != 200:
-        return None, _format_docs_error(response)
+        return None, _format_api_error(response, "Google Docs")
     try:
-        return response.json(), None
+        return orjson.loads(response.content), None
     except Exception as exc:
         return None, f"Google Docs API response parse error: {str(exc)}"
 
 
 async def _docs_post(path: str, json_body: dict | None = None) -> tuple[dict | None, str | None]:
-    token = _get_access_token()
-    url = f"{DOCS_API_BASE}{path}"
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.post(url, headers=_auth_headers(token), json=json_body)
-        if response.status_code == 401:
-            _invalidate_cached_access_token()
-            retry_token = _get_access_token()
-            if retry_token:
-                response = await client.post(url, headers=_auth_headers(retry_token), json=json_body)
-    if response.status_code not in (200, 201):
-        return None, _format_docs_error(response)
+    data, _, err = await _docs_post_with_status(path, json_body)
+    return data, err
+
+
+async def _docs_post_with_status(
+    path: str, json_body: dict | None = None
+) -> tuple[dict | None, int, str | None]:
+    """Like _docs_post, but also returns the HTTP status of the write."""
+    # Serialize the body ourselves so large insertText payloads skip httpx's stdlib json encoder.
+    content = orjson.dumps(json_body) if json_body is not None else None
+    async with _WRITE_SEMAPHORE:
+        response = await _authed_request(
+            "POST", f"{DOCS_API_BASE}{path}", headers=_JSON_CONTENT_HEADERS, content=content
+        )
+    status = response.status_code
+    if status not in (200, 201):
+        return None, status, _format_api_error(response, "Google Docs")
+    # Every Docs write goes through here; cached listings may now show stale
+    # names or modification order.
+    _LIST_CACHE.clear()
     try:
-        return response.json(), None
+        return orjson.loads(response.content), status, None
     except Exception as exc:
-        return None, f"Google Docs API response parse error: {str(exc)}"
+        return None, status, f"Google Docs API response parse error: {str(exc)}"
 
 
 async def _drive_get(path: str, params: dict | None = None) -> tuple[dict | None, str | None]:
-    token = _get_access_token()
-    url = f"{DRIVE_API_BASE}{path}"
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.get(url, headers=_auth_headers(token), params=params)
-        if response.status_code == 401:
-            _invalidate_cached_access_token()
-            retry_token = _get_access_token()
-            if retry_token:
-                response = await client.get(url, headers=_auth_headers(retry_token), params=params)
+    response = await _authed_request("GET", f"{DRIVE_API_BASE}{path}", params=params)
     if response.status_code != 200:
-        return None, _format_drive_error(response)
+        return None, _format_api_error(response, "Drive")
     try:
-        return response.json(), None
+        return orjson.loads(response.content), None
     except Exception as exc:
         return None, f"Drive API response parse error: {str(exc)}"
 
@@ -450,74 +755,167 @@ async def _drive_post_json(
     params: dict | None = None,
     json_body: dict | None = None,
 ) -> tuple[dict | None, str | None]:
-    token = _get_access_token()
-    url = f"{DRIVE_API_BASE}{path}"
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.post(url, headers=_auth_headers(token), params=params, json=json_body)
-        if response.status_code == 401:
-            _invalidate_cached_access_token()
-            retry_token = _get_access_token()
-            if retry_token:
-                response = await client.post(
-                    url,
-                    headers=_auth_headers(retry_token),
-                    params=params,
-                    json=json_body,
-                )
+    content = orjson.dumps(json_body) if json_body is not None else None
+    async with _WRITE_SEMAPHORE:
+        response = await _authed_request(
+            "POST",
+            f"{DRIVE_API_BASE}{path}",
+            params=params,
+            headers=_JSON_CONTENT_HEADERS,
+            content=content,
+        )
     if response.status_code not in (200, 201):
-        return None, _format_drive_error(response)
+        return None, _format_api_error(response, "Drive")
     try:
-        return response.json(), None
+        return orjson.loads(response.content), None
     except Exception:
         return {}, None
 
 
-async def _drive_get_bytes(path: str, params: dict | None = None) -> tuple[bytes | None, str | None]:
-    token = _get_access_token()
+async def _drive_stream_bytes(
+    path: str,
+    params: dict | None = None,
+    max_bytes: int | None = None,
+) -> tuple[bytes | None, int, str | None]:
+    """Streams a Drive download, keeping at most max_bytes and counting the full size.
+
+    Returns (kept_bytes, total_size, error). Bytes past max_bytes are counted and dropped,
+    so exports larger than the preview never sit in memory in full.
+    """
+    client = _get_http_client()
     url = f"{DRIVE_API_BASE}{path}"
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.get(url, headers=_auth_headers(token), params=params)
-        if response.status_code == 401:
-            _invalidate_cached_access_token()
-            retry_token = _get_access_token()
-            if retry_token:
-                response = await client.get(url, headers=_auth_headers(retry_token), params=params)
-    if response.status_code != 200:
-        return None, _format_drive_error(response)
-    return response.content, None
 
-
-def _format_doc_line(item: dict) -> str:
-    name = item.get("name", "Untitled")
-    doc_id = item.get("id", "-")
-    modified = item.get("modifiedTime", "-")
-    link = item.get("webViewLink", "-")
-    return f"- {name} | ID: {doc_id} | Modified: {modified} | Link: {link}"
+    async def download(token: str, retry_401: bool, retry_transient: bool):
+        # Returns the bare status code when the caller should retry; otherwise the result.
+        headers = _auth_headers(token)
+        async with client.stream("GET", url, headers=headers, params=params) as response:
+            status = response.status_code
+            if (status == 401 and retry_401) or (
+                status in TRANSIENT_STATUS_CODES and retry_transient
+            ):
+                return status
+            if status != 200:
+                await response.aread()
+                return None, 0, _format_api_error(response, "Drive")
+            declared_size = response.headers.get("content-length")
+            if max_bytes == 0 and declared_size and "content-encoding" not in response.headers:
+                # Nothing is kept, so an uncompressed body's Content-Length is its size;
+                # leaving the block closes the stream before the body is transferred.
+                return b"", int(declared_size), None
+            kept = bytearray()
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if max_bytes is None:
+                    kept += chunk
+                elif len(kept) < max_bytes:
+                    kept += chunk[: max_bytes - len(kept)]
+            return bytes(kept), size, None
+
+    token = await _get_access_token()
+    token_refreshed = False
+    attempt = 0
+    while True:
+        result = await download(
+            token, retry_401=not token_refreshed, retry_transient=attempt < HTTP_MAX_RETRIES
+        )
+        if not isinstance(result, int):
+            return result
+        if result == 401:
+            await _discard_rejected_token(token)
+            token = await _get_access_token()
+            token_refreshed = True
+        else:
+            attempt += 1
+            await asyncio.sleep(_retry_delay(attempt))
+
+
+def _get_cached_listing(key: tuple) -> str | None:
+    entry = _LIST_CACHE.get(key)
+    if entry is None:
+        return None
+    expires_at, result = entry
+    if time.monotonic() >= expires_at:
+        del _LIST_CACHE[key]
+        return None
+    _LIST_CACHE.move_to_end(key)
+    return result
+
+
+def _store_listing(key: tuple, result: str) -> str:
+    _LIST_CACHE[key] = (time.monotonic() + LIST_CACHE_TTL_SECONDS, result)
+    _LIST_CACHE.move_to_end(key)
+    while len(_LIST_CACHE) > LIST_CACHE_MAX_ENTRIES:
+        _LIST_CACHE.popitem(last=False)
+    return result
+
+
+async def _get_file_link(document_id: str) -> tuple[dict | None, str | None]:
+    """Returns the Drive name/webViewLink for a document, cached for a few minutes.
+
+    Neither field is changed by this server's own tools, so only the TTL bounds staleness.
+    """
+    entry = _FILE_LINK_CACHE.get(document_id)
+    if entry is not None:
+        expires_at, meta = entry
+        if time.monotonic() < expires_at:
+            _FILE_LINK_CACHE.move_to_end(document_id)
+            return meta, None
+        del _FILE_LINK_CACHE[document_id]
+
+    meta, err = await _drive_get(f"/files/{document_id}", params=_DRIVE_FILE_LINK_PARAMS)
+    if err:
+        return None, err
+    meta = meta or {}
+    _FILE_LINK_CACHE[document_id] = (time.monotonic() + FILE_LINK_CACHE_TTL_SECONDS, meta)
+    while len(_FILE_LINK_CACHE) > FILE_LINK_CACHE_MAX_ENTRIES:
+        _FILE_LINK_CACHE.popitem(last=False)
+    return meta, None
+
+
+def _file_link_outcome(result) -> tuple[dict | None, str | None]:
+    # _get_file_link runs alongside a write or export under gather(return_exceptions=True);
+    # if it raises, report that as a lookup error so the other result is still returned.
+    if isinstance(result, BaseException):
+        return None, str(result) or type(result).__name__
+    return result
+
+
+def _format_doc_lines(files: list[dict]) -> str:
+    return "\n".join(
+        f"- {item.get('name', 'Untitled')} | ID: {item.get('id', '-')} | "
+        f"Modified: {item.get('modifiedTime', '-')} | Link: {item.get('webViewLink', '-')}"
+        for item in files
+    )
 
 
 @mcp.tool()
 async def list_docs_documents(limit: int = 10) -> str:
     """Lists Google Docs documents from Drive."""
     try:
-        params = _ListDocsInput.model_validate({"limit": limit})
+        # A plain in-range int is already what validation would produce, so skip the
+        # validator; anything else goes through it to get the usual error message.
+        if type(limit) is int and LIST_LIMIT_MIN <= limit <= LIST_LIMIT_MAX:
+            params = _ListDocsInput.model_construct(limit=limit)
+        else:
+            params = _ListDocsInput.model_validate({"limit": limit})
+        cache_key = ("list", _DOCS_LIST_QUERY, params.limit)
+        cached = _get_cached_listing(cache_key)
+        if cached is not None:
+            return cached
         data, err = await _drive_get(
             "/files",
-            params={
-                "q": f"mimeType='{GOOGLE_DOC_MIME}' and trashed=false",
-                "orderBy": "modifiedTime desc",
-                "pageSize": params.limit,
-                "fields": "files(id,name,modifiedTime,webViewLink),nextPageToken",
-                "supportsAllDrives": "true",
-                "includeItemsFromAllDrives": "true",
-            },
+            params={**_DRIVE_LIST_BASE_PARAMS, "q": _DOCS_LIST_QUERY, "pageSize": params.limit},
         )
         if err:
             return err
         files = data.get("files", []) if data else []
         if not files:
-            return "No Google Docs documents found."
-        lines = [_format_doc_line(item) for item in files]
-        return f"Google Docs Documents (showing {len(lines)}):\n" + "\n".join(lines)
+            return _store_listing(cache_key, "No Google Docs documents found.")
+        return _store_listing(
+            cache_key,
+            f"Google Docs Documents (showing {len(files)}):\n" + _format_doc_lines(files),
+        )
     except Exception as exc:
         return f"Error listing Google Docs documents: {str(exc)}"
 
@@ -528,30 +926,26 @@ async def search_docs_documents(query: str, limit: int = 10) -> str:
     try:
         params = _SearchDocsInput.model_validate({"query": query, "limit": limit})
         safe_query = _escape_query(params.query)
-        q = (
-            f"mimeType='{GOOGLE_DOC_MIME}' and trashed=false and "
-            f"name contains '{safe_query}'"
-        )
+        q = f"{_DOCS_LIST_QUERY} and name contains '{safe_query}'"
+        cache_key = ("search", q, params.limit)
+        cached = _get_cached_listing(cache_key)
+        if cached is not None:
+            return cached
         data, err = await _drive_get(
             "/files",
-            params={
-                "q": q,
-                "orderBy": "modifiedTime desc",
-                "pageSize": params.limit,
-                "fields": "files(id,name,modifiedTime,webViewLink),nextPageToken",
-                "supportsAllDrives": "true",
-                "includeItemsFromAllDrives": "true",
-            },
+            params={**_DRIVE_LIST_BASE_PARAMS, "q": q, "pageSize": params.limit},
         )
         if err:
             return err
         files = data.get("files", []) if data else []
         if not files:
-            return f"No Google Docs documents found matching '{params.query}'"
-        lines = [_format_doc_line(item) for item in files]
-        return (
-            f"Google Docs search results for '{params.query}' (showing {len(lines)}):\n"
-            + "\n".join(lines)
+            return _store_listing(
+                cache_key, f"No Google Docs documents found matching '{params.query}'"
+            )
+        return _store_listing(
+            cache_key,
+            f"Google Docs search results for '{params.query}' (showing {len(files)}):\n"
+            + _format_doc_lines(files),
         )
     except Exception as exc:
         return f"Error searching Google Docs documents: {str(exc)}"
@@ -562,36 +956,30 @@ async def get_docs_document_metadata(document_id: str) -> str:
     """Gets metadata for a Google Docs document."""
     try:
         params = _DocumentIdInput.model_validate({"document_id": document_id})
-        doc_data, doc_err = await _docs_get(f"/documents/{params.document_id}")
+        # The Docs and Drive lookups are independent, so issue them concurrently.
+        (doc_data, doc_err), (drive_data, drive_err) = await asyncio.gather(
+            _docs_get(f"/documents/{params.document_id}", params=_DOC_METADATA_PARAMS),
+            _drive_get(f"/files/{params.document_id}", params=_DRIVE_DOC_METADATA_PARAMS),
+        )
         if doc_err:
             return doc_err
-        drive_data, drive_err = await _drive_get(
-            f"/files/{params.document_id}",
-            params={
-                "fields": "id,name,modifiedTime,owners(displayName,emailAddress),webViewLink",
-                "supportsAllDrives": "true",
-            },
-        )
-        owners = []
-        if drive_data:
-            owners = drive_data.get("owners", []) or []
-        owners_text = ", ".join(
-            [
-                f"{owner.get('displayName', '-') } <{owner.get('emailAddress', '-')}>"
-                for owner in owners
-            ]
-        ) or "-"
-        if drive_err and not drive_data:
+        drive_data = drive_data or _EMPTY
+        if drive_err and drive_data is _EMPTY:
             owners_text = f"- (warning: {drive_err})"
+        else:
+            owners_text = ", ".join(
+                f"{owner.get('displayName', '-') } <{owner.get('emailAddress', '-')}>"
+                for owner in drive_data.get("owners") or ()
+            ) or "-"
 
         return (
             "Google Docs Metadata:\n"
             f"Title: {doc_data.get('title', '-')}\n"
             f"Document ID: {doc_data.get('documentId', params.document_id)}\n"
             f"Revision ID: {doc_data.get('revisionId', '-')}\n"
-            f"Last Modified: {(drive_data or {}).get('modifiedTime', '-')}\n"
+            f"Last Modified: {drive_data.get('modifiedTime', '-')}\n"
             f"Owners: {owners_text}\n"
-            f"Link: {(drive_data or {}).get('webViewLink', '-')}"
+            f"Link: {drive_data.get('webViewLink', '-')}"
         )
     except Exception as exc:
         return f"Error getting Google Docs metadata: {str(exc)}"
@@ -604,16 +992,16 @@ async def read_docs_document(document_id: str, max_chars: int = 8000) -> str:
         params = _ReadDocumentInput.model_validate(
             {"document_id": document_id, "max_chars": max_chars}
         )
-        doc_data, err = await _docs_get(f"/documents/{params.document_id}")
+        doc_data, err = await _docs_get(f"/documents/{params.document_id}", params=_DOC_TEXT_PARAMS)
         if err:
             return err
 
         title = doc_data.get("title", params.document_id)
-        text = _extract_document_text(doc_data)
+        text, truncated = _extract_document_text(doc_data, max_chars=params.max_chars)
         if not text:
             return f"Google Docs document '{title}' is empty."
-        if len(text) > params.max_chars:
-            text = text[: params.max_chars].rstrip() + "\n\n[Truncated]"
+        if truncated:
+            text += "\n\n[Truncated]"
         return f"Google Docs Content: {title}\n\n{text}"
     except Exception as exc:
         return f"Error reading Google Docs document: {str(exc)}"
@@ -633,6 +1021,8 @@ async def create_docs_document(title: str, initial_content: str = "") -> str:
             return "Failed to create Google Docs document."
 
         document_id = created.get("documentId", "-")
+        # documents.create ignores body content, so initial text needs a second batchUpdate
+        # call. Both requests reuse the pooled connection and the cached access token.
         if params.initial_content and document_id != "-":
             _, update_err = await _docs_post(
                 f"/documents/{document_id}:batchUpdate",
@@ -675,27 +1065,10 @@ async def append_docs_text(document_id: str, text: str) -> str:
     """Appends text at the end of a Google Docs document."""
     try:
         params = _AppendTextInput.model_validate({"document_id": document_id, "text": text})
-        doc_data, err = await _docs_get(f"/documents/{params.document_id}")
+        index, err = await _append_to_document(params.document_id, params.text)
         if err:
             return err
 
-        index = _document_insert_index(doc_data)
-        _, update_err = await _docs_post(
-            f"/documents/{params.document_id}:batchUpdate",
-            json_body={
-                "requests": [
-                    {
-                        "insertText": {
-                            "location": {"index": index},
-                            "text": params.text,
-                        }
-                    }
-                ]
-            },
-        )
-        if update_err:
-            return update_err
-
         link = f"https://docs.google.com/document/d/{params.document_id}/edit"
         return (
             "Text appended to Google Docs document:\n"
@@ -726,31 +1099,14 @@ async def replace_docs_text(
         )
         data, err = await _docs_post(
             f"/documents/{params.document_id}:batchUpdate",
-            json_body={
-                "requests": [
-                    {
-                        "replaceAllText": {
-                            "containsText": {
-                                "text": params.find_text,
-                                "matchCase": params.match_case,
-                            },
-                            "replaceText": params.replace_text,
-                        }
-                    }
-                ]
-            },
+            json_body=_replace_all_text_body(
+                params.find_text, params.replace_text, params.match_case
+            ),
         )
         if err:
             return err
 
-        replies = data.get("replies", []) if data else []
-        occurrences = 0
-        if replies:
-            first = replies[0]
-            if isinstance(first, dict):
-                replace_resp = first.get("replaceAllText", {})
-                if isinstance(replace_resp, dict):
-                    occurrences = int(replace_resp.get("occurrencesChanged", 0))
+        occurrences = _occurrences_changed(data)
 
         link = f"https://docs.google.com/document/d/{params.document_id}/edit"
         return (
@@ -796,41 +1152,44 @@ async def share_docs_to_user(
         if params.send_notification and note:
             query_params["emailMessage"] = note
 
-        perm_resp, perm_err = await _drive_post_json(
-            f"/files/{params.document_id}/permissions",
-            params=query_params,
-            json_body={
-                "type": "user",
-                "role": normalized_role,
-                "emailAddress": params.user_email,
-            },
+        # The name/link lookup does not depend on the new permission; run both together.
+        perm_result, meta_result = await asyncio.gather(
+            _drive_post_json(
+                f"/files/{params.document_id}/permissions",
+                params=query_params,
+                json_body={
+                    "type": "user",
+                    "role": normalized_role,
+                    "emailAddress": params.user_email,
+                },
+            ),
+            _get_file_link(params.document_id),
+            return_exceptions=True,
         )
+        if isinstance(perm_result, BaseException):
+            raise perm_result
+        perm_resp, perm_err = perm_result
+        meta, meta_err = _file_link_outcome(meta_result)
         if perm_err:
             return perm_err
-
-        meta, meta_err = await _drive_get(
-            f"/files/{params.document_id}",
-            params={
-                "fields": "id,name,webViewLink",
-                "supportsAllDrives": "true",
-            },
-        )
+        permission_id = (perm_resp or _EMPTY).get("id", "-")
         if meta_err:
             return (
                 "Document shared, but failed to fetch metadata.\n"
-                f"Permission ID: {(perm_resp or {}).get('id', '-')}\n"
+                f"Permission ID: {permission_id}\n"
                 f"Error: {meta_err}"
             )
+        meta = meta or _EMPTY
 
         return (
             "Google Docs sharing completed:\n"
             f"Document ID: {params.document_id}\n"
-            f"Document Name: {(meta or {}).get('name', '-')}\n"
+            f"Document Name: {meta.get('name', '-')}\n"
             f"Shared To: {params.user_email}\n"
             f"Role: {normalized_role}\n"
             f"Notification Sent: {params.send_notification}\n"
-            f"Permission ID: {(perm_resp or {}).get('id', '-')}\n"
-            f"Link: {(meta or {}).get('webViewLink', '-')}"
+            f"Permission ID: {permission_id}\n"
+            f"Link: {meta.get('webViewLink', '-')}"
         )
     except Exception as exc:
         return f"Error sharing Google Docs document: {str(exc)}"
@@ -855,49 +1214,55 @@ async def export_docs_document(
         if format_err:
             return format_err
 
-        payload, export_err = await _drive_get_bytes(
-            f"/files/{params.document_id}/export",
-            params={"mimeType": mime_type},
+        # The name/link lookup overlaps the (possibly large) export download.
+        normalized_format = params.export_format.lower().strip()
+        is_text = normalized_format in {"txt", "html"}
+        # Text exports keep only enough bytes for max_chars characters (UTF-8 is at most
+        # 4 bytes per character); binary exports are only measured, never printed.
+        export_result, meta_result = await asyncio.gather(
+            _drive_stream_bytes(
+                f"/files/{params.document_id}/export",
+                params={"mimeType": mime_type},
+                max_bytes=params.max_chars * 4 if is_text else 0,
+            ),
+            _get_file_link(params.document_id),
+            return_exceptions=True,
         )
+        if isinstance(export_result, BaseException):
+            raise export_result
+        payload, size_bytes, export_err = export_result
+        meta, meta_err = _file_link_outcome(meta_result)
         if export_err:
             return export_err
         if payload is None:
             return "Failed to export Google Docs document."
+        # A failed lookup falls back to "-" for both fields, same as a missing key.
+        meta = _EMPTY if meta_err else meta or _EMPTY
+        name = meta.get("name", "-")
+        link = meta.get("webViewLink", "-")
 
-        meta, meta_err = await _drive_get(
-            f"/files/{params.document_id}",
-            params={
-                "fields": "id,name,webViewLink",
-                "supportsAllDrives": "true",
-            },
-        )
-        if meta_err:
-            meta = {"name": "-", "webViewLink": "-"}
-
-        size_bytes = len(payload)
-        normalized_format = params.export_format.lower().strip()
-        if normalized_format in {"txt", "html"}:
+        if is_text:
             text = payload.decode("utf-8", errors="replace")
-            if len(text) > params.max_chars:
+            if len(text) > params.max_chars or size_bytes > len(payload):
                 text = text[: params.max_chars].rstrip() + "\n\n[Truncated]"
             return (
                 "Google Docs export completed:\n"
                 f"Document ID: {params.document_id}\n"
-                f"Document Name: {(meta or {}).get('name', '-')}\n"
+                f"Document Name: {name}\n"
                 f"Format: {normalized_format}\n"
                 f"Size Bytes: {size_bytes}\n"
-                f"Link: {(meta or {}).get('webViewLink', '-')}\n\n"
+                f"Link: {link}\n\n"
                 f"{text}"
             )
 
         return (
             "Google Docs export completed:\n"
             f"Document ID: {params.document_id}\n"
-            f"Document Name: {(meta or {}).get('name', '-')}\n"
+            f"Document Name: {name}\n"
             f"Format: {normalized_format}\n"
             f"MIME Type: {mime_type}\n"
             f"Size Bytes: {size_bytes}\n"
-            f"Link: {(meta or {}).get('webViewLink', '-')}\n"
+            f"Link: {link}\n"
             "Binary export generated successfully (content not printed in chat)."
         )
     except Exception as exc:
@@ -923,35 +1288,28 @@ async def append_docs_structured_content(
                 "numbered_items": numbered_items or [],
             }
         )
-        doc_data, err = await _docs_get(f"/documents/{params.document_id}")
-        if err:
-            return err
         text = _build_structured_append_text(params)
         if not text:
             return "Nothing to append."
 
-        index = _document_insert_index(doc_data)
-        _, update_err = await _docs_post(
+        # endOfSegmentLocation lets Docs resolve the end of the body itself, so the append is a
+        # single request with no structure read (and no stale index if the doc just changed).
+        _, err = await _docs_post(
             f"/documents/{params.document_id}:batchUpdate",
             json_body={
-                "requests": [
-                    {
-                        "insertText": {
-                            "location": {"index": index},
-                            "text": text,
-                        }
-                    }
-                ]
+                "requests": [{"insertText": {"endOfSegmentLocation": {}, "text": text}}]
             },
         )
-        if update_err:
-            return update_err
+        if err:
+            return err
+        # The body end moved without a revision we could record; drop any remembered index.
+        _INSERT_INDEX_CACHE.pop(params.document_id, None)
 
         link = f"https://docs.google.com/document/d/{params.document_id}/edit"
         return (
             "Structured content appended to Google Docs document:\n"
             f"Document ID: {params.document_id}\n"
-            f"Inserted At Index: {index}\n"
+            "Inserted At: end of body\n"
             f"Characters Added: {len(text)}\n"
             f"Link: {link}"
         )
@@ -978,50 +1336,43 @@ async def replace_docs_text_if_revision(
                 "match_case": match_case,
             }
         )
-        doc_data, doc_err = await _docs_get(f"/documents/{params.document_id}")
-        if doc_err:
-            return doc_err
-        current_revision_id = str(doc_data.get("revisionId", "")).strip()
-        if current_revision_id != params.expected_revision_id:
-            return (
-                "Revision mismatch. No changes applied.\n"
-                f"Document ID: {params.document_id}\n"
-                f"Expected Revision ID: {params.expected_revision_id}\n"
-                f"Current Revision ID: {current_revision_id or '-'}"
-            )
-
-        data, err = await _docs_post(
+        # writeControl makes Docs reject the update when the revision has moved on, so the
+        # happy path is a single request; the revision is only fetched after that 400.
+        data, status, err = await _docs_post_with_status(
             f"/documents/{params.document_id}:batchUpdate",
-            json_body={
-                "requests": [
-                    {
-                        "replaceAllText": {
-                            "containsText": {
-                                "text": params.find_text,
-                                "matchCase": params.match_case,
-                            },
-                            "replaceText": params.replace_text,
-                        }
-                    }
-                ]
-            },
+            json_body=_replace_all_text_body(
+                params.find_text,
+                params.replace_text,
+                params.match_case,
+                required_revision_id=params.expected_revision_id,
+            ),
         )
         if err:
+            # A 5xx may have applied the replacement and moved the revision, so only a 400
+            # is checked against the current revision; any other error is returned as-is.
+            if status != REVISION_MISMATCH_STATUS:
+                return err
+            doc_data, doc_err = await _docs_get(
+                f"/documents/{params.document_id}", params=_DOC_REVISION_PARAMS
+            )
+            if doc_err:
+                return err
+            current_revision_id = str(doc_data.get("revisionId", "")).strip()
+            if current_revision_id != params.expected_revision_id:
+                return (
+                    "Revision mismatch. No changes applied.\n"
+                    f"Document ID: {params.document_id}\n"
+                    f"Expected Revision ID: {params.expected_revision_id}\n"
+                    f"Current Revision ID: {current_revision_id or '-'}"
+                )
             return err
-        replies = data.get("replies", []) if data else []
-        occurrences = 0
-        if replies:
-            first = replies[0]
-            if isinstance(first, dict):
-                replace_resp = first.get("replaceAllText", {})
-                if isinstance(replace_resp, dict):
-                    occurrences = int(replace_resp.get("occurrencesChanged", 0))
+        occurrences = _occurrences_changed(data)
 
         link = f"https://docs.google.com/document/d/{params.document_id}/edit"
         return (
             "Safe text replacement completed in Google Docs document:\n"
             f"Document ID: {params.document_id}\n"
-            f"Revision ID: {current_revision_id or '-'}\n"
+            f"Revision ID: {params.expected_revision_id}\n"
             f"Find Text: {params.find_text}\n"
             f"Replace Text: {params.replace_text}\n"
             f"Occurrences Changed: {occurrences}\n"
@@ -1,43 +1,97 @@
+import asyncio
+import importlib.util
 import os
+import secrets
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
 
 import httpx
+import orjson
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel, ConfigDict, Field
 
 load_dotenv()
-mcp = FastMCP("GoogleDrive")
+
+
+@asynccontextmanager
+async def _lifespan(_server: FastMCP):
+    try:
+        yield
+    finally:
+        await _close_http_client()
+
+
+mcp = FastMCP("GoogleDrive", lifespan=_lifespan)
 
 DRIVE_API_BASE = "https://www.googleapis.com/drive/v3"
 DRIVE_UPLOAD_API_BASE = "https://www.googleapis.com/upload/drive/v3"
 GOOGLE_OAUTH_TOKEN_ENDPOINT = "https://oauth2.googleapis.com/token"
 HTTP_TIMEOUT = httpx.Timeout(timeout=20.0, connect=5.0)
+HTTP_LIMITS = httpx.Limits(
+    max_connections=40,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0,
+)
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
 GOOGLE_WORKSPACE_MIME_PREFIX = "application/vnd.google-apps."
-SUPPORTED_TEXT_MIME_TYPES = {
-    "application/json",
-    "application/xml",
-    "application/javascript",
-    "application/x-javascript",
-    "application/yaml",
-    "application/x-yaml",
-    "application/csv",
-    "text/csv",
-    "text/markdown",
-    "text/x-markdown",
-    "application/x-www-form-urlencoded",
-}
-SHARE_ROLES = {"reader", "commenter", "writer"}
+SUPPORTED_TEXT_MIME_TYPES = frozenset(
+    {
+        "application/json",
+        "application/xml",
+        "application/javascript",
+        "application/x-javascript",
+        "application/yaml",
+        "application/x-yaml",
+        "application/csv",
+        "text/csv",
+        "text/markdown",
+        "text/x-markdown",
+        "application/x-www-form-urlencoded",
+    }
+)
+SHARE_ROLES = frozenset({"reader", "commenter", "writer"})
 TOKEN_EXPIRY_SAFETY_MARGIN_SECONDS = 60
+FILE_META_CACHE_TTL_SECONDS = 30
+FILE_META_CACHE_MAX_ENTRIES = 256
+LIST_LIMIT_MIN = 1
+LIST_LIMIT_MAX = 100
+
+DRIVE_FORBIDDEN_HINT = (
+    " Hint: ensure token has scope https://www.googleapis.com/auth/drive "
+    "and your account has permission to share/edit this item."
+)
+
+_ALLOWED_SHARE_ROLES_TEXT = ", ".join(sorted(SHARE_ROLES))
+_NOT_TRASHED_QUERY = "trashed=false"
+_SHARED_WITH_ME_QUERY = "sharedWithMe=true and trashed=false"
+# Shared by the three listing tools; each call only adds q/pageSize (and orderBy for shared).
+_FILES_LIST_BASE_PARAMS = MappingProxyType(
+    {
+        "orderBy": "modifiedTime desc",
+        "fields": "files(id,name,mimeType,modifiedTime,size,webViewLink),nextPageToken",
+        "supportsAllDrives": "true",
+        "includeItemsFromAllDrives": "true",
+    }
+)
 
 _CACHED_ACCESS_TOKEN: str | None = None
-_CACHED_ACCESS_TOKEN_EXPIRES_AT: datetime | None = None
+_CACHED_ACCESS_TOKEN_EXPIRES_AT: float | None = None
+# One pooled client for every Drive call so keep-alive connections (and HTTP/2 when h2 is
+# installed) survive across tool invocations instead of paying a TLS handshake each time.
+_HTTP_CLIENT: httpx.AsyncClient | None = None
+_CACHED_AUTH_HEADERS: tuple[str, dict[str, str]] | None = None
+# (file_id, fields) -> (expires_at, metadata) for lookups that only feed tool output.
+_FILE_META_CACHE: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
 
 
 class _ListDriveFilesInput(BaseModel):
     model_config = ConfigDict(str_strip_whitespace=True)
 
-    limit: int = Field(default=10, ge=1, le=100, strict=True)
+    limit: int = Field(default=10, ge=LIST_LIMIT_MIN, le=LIST_LIMIT_MAX, strict=True)
     folder_id: str | None = Field(default=None, min_length=1)
     mime_type: str | None = Field(default=None, min_length=1)
 
@@ -64,7 +118,7 @@ class _ReadDriveTextFileInput(BaseModel):
 
 
 class _ListSharedWithMeInput(BaseModel):
-    limit: int = Field(default=10, ge=1, le=100, strict=True)
+    limit: int = Field(default=10, ge=LIST_LIMIT_MIN, le=LIST_LIMIT_MAX, strict=True)
 
 
 class _CreateDriveFolderInput(BaseModel):
@@ -110,9 +164,9 @@ class _CreateDrivePublicLinkInput(BaseModel):
 
 def _get_cached_access_token() -> str | None:
     global _CACHED_ACCESS_TOKEN, _CACHED_ACCESS_TOKEN_EXPIRES_AT
-    if not _CACHED_ACCESS_TOKEN or not _CACHED_ACCESS_TOKEN_EXPIRES_AT:
+    if not _CACHED_ACCESS_TOKEN or _CACHED_ACCESS_TOKEN_EXPIRES_AT is None:
         return None
-    if datetime.now(timezone.utc) >= _CACHED_ACCESS_TOKEN_EXPIRES_AT:
+    if time.monotonic() >= _CACHED_ACCESS_TOKEN_EXPIRES_AT:
         _CACHED_ACCESS_TOKEN = None
         _CACHED_ACCESS_TOKEN_EXPIRES_AT = None
         return None
@@ -123,7 +177,7 @@ def _set_cached_access_token(token: str, expires_in_seconds: int) -> None:
     global _CACHED_ACCESS_TOKEN, _CACHED_ACCESS_TOKEN_EXPIRES_AT
     safe_ttl = max(0, int(expires_in_seconds) - TOKEN_EXPIRY_SAFETY_MARGIN_SECONDS)
     _CACHED_ACCESS_TOKEN = token
-    _CACHED_ACCESS_TOKEN_EXPIRES_AT = datetime.now(timezone.utc) + timedelta(seconds=safe_ttl)
+    _CACHED_ACCESS_TOKEN_EXPIRES_AT = time.monotonic() + safe_ttl
 
 
 def _refresh_access_token(
@@ -223,11 +277,39 @@ def _get_access_token() -> str:
 
 
 def _client_kwargs() -> dict:
-    return {"follow_redirects": True, "timeout": HTTP_TIMEOUT}
+    return {
+        "follow_redirects": True,
+        "timeout": HTTP_TIMEOUT,
+        "limits": HTTP_LIMITS,
+        "http2": HTTP2_ENABLED,
+    }
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(**_client_kwargs())
+    return _HTTP_CLIENT
+
+
+async def _close_http_client() -> None:
+    global _HTTP_CLIENT
+    client = _HTTP_CLIENT
+    _HTTP_CLIENT = None
+    if client is not None and not client.is_closed:
+        await client.aclose()
 
 
 def _auth_headers(token: str) -> dict:
-    return {"Authorization": f"Bearer {token}"}
+    # The token only changes on refresh, so reuse one header dict per token.
+    # Callers must treat the returned dict as read-only.
+    global _CACHED_AUTH_HEADERS
+    cached = _CACHED_AUTH_HEADERS
+    if cached is not None and cached[0] == token:
+        return cached[1]
+    headers = {"Authorization": f"Bearer {token}"}
+    _CACHED_AUTH_HEADERS = (token, headers)
+    return headers
 
 
 def _escape_drive_query(value: str) -> str:
@@ -235,29 +317,36 @@ def _escape_drive_query(value: str) -> str:
 
 
 def _is_text_like_mime_type(mime_type: str) -> bool:
+    # Drive reports MIME types in lowercase, so try the value as-is before lowering it.
+    if mime_type.startswith("text/") or mime_type in SUPPORTED_TEXT_MIME_TYPES:
+        return True
     lowered = mime_type.lower()
+    if lowered == mime_type:
+        return False
     return lowered.startswith("text/") or lowered in SUPPORTED_TEXT_MIME_TYPES
 
 
 def _format_file_line(file_data: dict) -> str:
-    name = file_data.get("name") or "Untitled"
-    file_id = file_data.get("id") or "-"
-    mime_type = file_data.get("mimeType") or "-"
-    modified = file_data.get("modifiedTime") or "-"
-    size = file_data.get("size") or "-"
-    web_link = file_data.get("webViewLink") or "-"
+    get = file_data.get
+    # `or` (not a .get default) so empty strings from the API also render as placeholders.
     return (
-        f"- {name} | ID: {file_id} | Type: {mime_type} | Modified: {modified} | "
-        f"Size: {size} | Link: {web_link}"
+        f"- {get('name') or 'Untitled'} | ID: {get('id') or '-'} | "
+        f"Type: {get('mimeType') or '-'} | Modified: {get('modifiedTime') or '-'} | "
+        f"Size: {get('size') or '-'} | Link: {get('webViewLink') or '-'}"
     )
 
 
+def _format_file_lines(files: list[dict]) -> str:
+    return "\n".join(map(_format_file_line, files))
+
+
 def _format_drive_error(response: httpx.Response) -> str:
     status = response.status_code
+    raw = response.content
     detail = ""
     reason = ""
     try:
-        payload = response.json()
+        payload = orjson.loads(raw)
         error_obj = payload.get("error", {}) if isinstance(payload, dict) else {}
         detail = str(error_obj.get("message", "")).strip()
         errors = error_obj.get("errors", []) if isinstance(error_obj, dict) else []
@@ -266,14 +355,9 @@ def _format_drive_error(response: httpx.Response) -> str:
             if isinstance(first, dict):
                 reason = str(first.get("reason", "")).strip()
     except Exception:
-        detail = response.text.strip()[:300]
+        detail = raw.strip()[:300].decode("utf-8", errors="replace")
 
-    hint = ""
-    if status == 403:
-        hint = (
-            " Hint: ensure token has scope https://www.googleapis.com/auth/drive "
-            "and your account has permission to share/edit this item."
-        )
+    hint = DRIVE_FORBIDDEN_HINT if status == 403 else ""
     reason_part = f" ({reason})" if reason else ""
     detail_part = f" - {detail}" if detail else ""
     return f"Error: Drive API request failed: {status}{reason_part}{detail_part}.{hint}".strip()
@@ -282,50 +366,66 @@ def _format_drive_error(response: httpx.Response) -> str:
 def _normalize_role(role: str) -> tuple[str | None, str | None]:
     lowered = role.lower().strip()
     if lowered not in SHARE_ROLES:
-        return None, f"Invalid role '{role}'. Allowed roles: {', '.join(sorted(SHARE_ROLES))}"
+        return None, f"Invalid role '{role}'. Allowed roles: {_ALLOWED_SHARE_ROLES_TEXT}"
     return lowered, None
 
 
 def _to_rfc3339_after_days(days: int) -> str:
     expires_at = datetime.now(timezone.utc) + timedelta(days=days)
-    return expires_at.isoformat().replace("+00:00", "Z")
+    # Second precision is plenty for a days-out expiry and formats straight to the UTC form.
+    return expires_at.strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
 async def _request_json(path: str, params: dict | None = None) -> tuple[dict | None, str | None]:
     token = _get_access_token()
     url = f"{DRIVE_API_BASE}{path}"
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.get(url, headers=_auth_headers(token), params=params)
+    client = _get_http_client()
+    response = await client.get(url, headers=_auth_headers(token), params=params)
 
     if response.status_code != 200:
         return None, _format_drive_error(response)
     try:
-        return response.json(), None
+        return orjson.loads(response.content), None
     except Exception as exc:
         return None, f"Drive API response parse error: {str(exc)}"
 
 
-async def _request_bytes(path: str, params: dict | None = None) -> tuple[bytes | None, str | None]:
+async def _request_bytes(
+    path: str,
+    params: dict | None = None,
+    max_bytes: int | None = None,
+) -> tuple[bytes | None, str | None]:
+    """Downloads a Drive resource, stopping after max_bytes when a cap is given.
+
+    Leaving the stream early closes the connection, so the rest of a large file is never
+    transferred.
+    """
     token = _get_access_token()
     url = f"{DRIVE_API_BASE}{path}"
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.get(url, headers=_auth_headers(token), params=params)
-
-    if response.status_code != 200:
-        return None, _format_drive_error(response)
-    return response.content, None
+    client = _get_http_client()
+    async with client.stream("GET", url, headers=_auth_headers(token), params=params) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return None, _format_drive_error(response)
+        kept = bytearray()
+        async for chunk in response.aiter_bytes():
+            kept += chunk
+            if max_bytes is not None and len(kept) >= max_bytes:
+                del kept[max_bytes:]
+                break
+        return bytes(kept), None
 
 
 async def _post_json(path: str, params: dict | None = None, json_body: dict | None = None):
     token = _get_access_token()
     url = f"{DRIVE_API_BASE}{path}"
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.post(url, headers=_auth_headers(token), params=params, json=json_body)
+    client = _get_http_client()
+    response = await client.post(url, headers=_auth_headers(token), params=params, json=json_body)
 
     if response.status_code not in (200, 201):
         return None, _format_drive_error(response)
     try:
-        return response.json(), None
+        return orjson.loads(response.content), None
     except Exception as exc:
         return None, f"Drive API response parse error: {str(exc)}"
 
@@ -333,63 +433,134 @@ async def _post_json(path: str, params: dict | None = None, json_body: dict | No
 async def _patch_json(path: str, params: dict | None = None, json_body: dict | None = None):
     token = _get_access_token()
     url = f"{DRIVE_API_BASE}{path}"
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.patch(url, headers=_auth_headers(token), params=params, json=json_body)
+    client = _get_http_client()
+    response = await client.patch(url, headers=_auth_headers(token), params=params, json=json_body)
 
     if response.status_code != 200:
         return None, _format_drive_error(response)
     try:
-        return response.json(), None
+        return orjson.loads(response.content), None
     except Exception as exc:
         return None, f"Drive API response parse error: {str(exc)}"
 
 
-async def _upload_file_media(file_id: str, content: bytes, content_type: str = "text/plain; charset=utf-8"):
-    token = _get_access_token()
-    url = f"{DRIVE_UPLOAD_API_BASE}/files/{file_id}"
-    headers = _auth_headers(token)
-    headers["Content-Type"] = content_type
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.patch(
-            url,
-            headers=headers,
-            params={
-                "uploadType": "media",
-                "supportsAllDrives": "true",
-            },
-            content=content,
+def _multipart_related_body(metadata: dict, content: str, content_type: str) -> tuple[bytes, str]:
+    # A random boundary cannot realistically collide with user content. The content is
+    # encoded inline so its UTF-8 copy is released as soon as the body is joined.
+    boundary = f"drive-upload-{secrets.token_hex(16)}"
+    delimiter = f"--{boundary}\r\n".encode("ascii")
+    body = b"".join(
+        (
+            delimiter,
+            b"Content-Type: application/json; charset=UTF-8\r\n\r\n",
+            orjson.dumps(metadata),
+            b"\r\n",
+            delimiter,
+            f"Content-Type: {content_type}\r\n\r\n".encode("ascii"),
+            content.encode("utf-8"),
+            f"\r\n--{boundary}--".encode("ascii"),
         )
+    )
+    return body, boundary
+
+
+async def _upload_multipart(
+    metadata: dict,
+    content: str,
+    content_type: str = "text/plain; charset=utf-8",
+) -> tuple[dict | None, str | None]:
+    """Creates a file with its metadata and content in one multipart upload request."""
+    token = _get_access_token()
+    body, boundary = _multipart_related_body(metadata, content, content_type)
+    headers = {
+        **_auth_headers(token),
+        "Content-Type": f"multipart/related; boundary={boundary}",
+    }
+    client = _get_http_client()
+    response = await client.post(
+        f"{DRIVE_UPLOAD_API_BASE}/files",
+        headers=headers,
+        params={
+            "uploadType": "multipart",
+            "supportsAllDrives": "true",
+            "fields": "id,name,mimeType,size,webViewLink",
+        },
+        content=body,
+    )
+
+    if response.status_code not in (200, 201):
+        return None, _format_drive_error(response)
+    try:
+        return orjson.loads(response.content), None
+    except Exception as exc:
+        return None, f"Drive API response parse error: {str(exc)}"
 
-    if response.status_code != 200:
-        return _format_drive_error(response)
-    return None
+
+async def _get_file_meta(file_id: str, fields: str) -> tuple[dict | None, str | None]:
+    """GET /files/{file_id} for the given fields, reusing a recent successful answer.
+
+    Only for fields this server never changes (names, types, links); anything a tool acts
+    on, like the parents read before a move, must be fetched fresh.
+    """
+    key = (file_id, fields)
+    entry = _FILE_META_CACHE.get(key)
+    if entry is not None:
+        expires_at, data = entry
+        if time.monotonic() < expires_at:
+            _FILE_META_CACHE.move_to_end(key)
+            return data, None
+        del _FILE_META_CACHE[key]
+
+    data, err = await _request_json(
+        f"/files/{file_id}", {"fields": fields, "supportsAllDrives": "true"}
+    )
+    if err or data is None:
+        return data, err
+    _FILE_META_CACHE[key] = (time.monotonic() + FILE_META_CACHE_TTL_SECONDS, data)
+    while len(_FILE_META_CACHE) > FILE_META_CACHE_MAX_ENTRIES:
+        _FILE_META_CACHE.popitem(last=False)
+    return data, None
+
+
+async def _settle_speculative_task(task: asyncio.Future) -> None:
+    # Cancel a lookahead request the caller no longer needs, then wait for it so its failure
+    # or cancellation is retrieved here instead of logged as "never retrieved".
+    if not task.done():
+        task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def _request_item_link(item_id: str) -> tuple[dict | None, str | None]:
+    return await _get_file_meta(item_id, "id,name,mimeType,webViewLink")
 
 
 @mcp.tool()
 async def list_drive_files(limit: int = 10, folder_id: str | None = None, mime_type: str | None = None) -> str:
     """Lists files from Google Drive."""
     try:
-        params = _ListDriveFilesInput.model_validate(
-            {"limit": limit, "folder_id": folder_id, "mime_type": mime_type}
-        )
-        query_parts = ["trashed=false"]
+        # The unfiltered listing with a plain in-range int is already what validation would
+        # produce, so skip the validator; anything else goes through it for the usual errors.
+        if (
+            type(limit) is int
+            and LIST_LIMIT_MIN <= limit <= LIST_LIMIT_MAX
+            and folder_id is None
+            and mime_type is None
+        ):
+            params = _ListDriveFilesInput.model_construct(
+                limit=limit, folder_id=None, mime_type=None
+            )
+        else:
+            params = _ListDriveFilesInput.model_validate(
+                {"limit": limit, "folder_id": folder_id, "mime_type": mime_type}
+            )
+        query = _NOT_TRASHED_QUERY
         if params.folder_id:
-            safe_folder = _escape_drive_query(params.folder_id)
-            query_parts.append(f"'{safe_folder}' in parents")
+            query += f" and '{_escape_drive_query(params.folder_id)}' in parents"
         if params.mime_type:
-            safe_mime = _escape_drive_query(params.mime_type)
-            query_parts.append(f"mimeType='{safe_mime}'")
+            query += f" and mimeType='{_escape_drive_query(params.mime_type)}'"
 
         data, err = await _request_json(
-            "/files",
-            {
-                "q": " and ".join(query_parts),
-                "orderBy": "modifiedTime desc",
-                "pageSize": params.limit,
-                "fields": "files(id,name,mimeType,modifiedTime,size,webViewLink),nextPageToken",
-                "supportsAllDrives": "true",
-                "includeItemsFromAllDrives": "true",
-            },
+            "/files", {**_FILES_LIST_BASE_PARAMS, "q": query, "pageSize": params.limit}
         )
         if err:
             return err
@@ -397,8 +568,7 @@ async def list_drive_files(limit: int = 10, folder_id: str | None = None, mime_t
         files = data.get("files", []) if data else []
         if not files:
             return "No files found."
-        lines = [_format_file_line(item) for item in files]
-        return f"Drive Files (showing {len(lines)}):\n" + "\n".join(lines)
+        return f"Drive Files (showing {len(files)}):\n" + _format_file_lines(files)
     except Exception as exc:
         return f"Error listing drive files: {str(exc)}"
 
@@ -410,22 +580,12 @@ async def search_drive_files(query: str, limit: int = 10, folder_id: str | None
         params = _SearchDriveFilesInput.model_validate(
             {"query": query, "limit": limit, "folder_id": folder_id}
         )
-        safe_query = _escape_drive_query(params.query)
-        query_parts = [f"name contains '{safe_query}'", "trashed=false"]
+        query = f"name contains '{_escape_drive_query(params.query)}' and {_NOT_TRASHED_QUERY}"
         if params.folder_id:
-            safe_folder = _escape_drive_query(params.folder_id)
-            query_parts.append(f"'{safe_folder}' in parents")
+            query += f" and '{_escape_drive_query(params.folder_id)}' in parents"
 
         data, err = await _request_json(
-            "/files",
-            {
-                "q": " and ".join(query_parts),
-                "orderBy": "modifiedTime desc",
-                "pageSize": params.limit,
-                "fields": "files(id,name,mimeType,modifiedTime,size,webViewLink),nextPageToken",
-                "supportsAllDrives": "true",
-                "includeItemsFromAllDrives": "true",
-            },
+            "/files", {**_FILES_LIST_BASE_PARAMS, "q": query, "pageSize": params.limit}
         )
         if err:
             return err
@@ -433,8 +593,10 @@ async def search_drive_files(query: str, limit: int = 10, folder_id: str | None
         files = data.get("files", []) if data else []
         if not files:
             return f"No files found matching '{params.query}'"
-        lines = [_format_file_line(item) for item in files]
-        return f"Search Results for '{params.query}' (showing {len(lines)}):\n" + "\n".join(lines)
+        return (
+            f"Search Results for '{params.query}' (showing {len(files)}):\n"
+            + _format_file_lines(files)
+        )
     except Exception as exc:
         return f"Error searching drive files: {str(exc)}"
 
@@ -491,36 +653,51 @@ async def read_drive_text_file(file_id: str, max_chars: int = 8000) -> str:
     """Reads textual content from a regular (non-Google Workspace) Drive file."""
     try:
         params = _ReadDriveTextFileInput.model_validate({"file_id": file_id, "max_chars": max_chars})
-        metadata, err = await _request_json(
-            f"/files/{params.file_id}",
-            {"fields": "id,name,mimeType,size", "supportsAllDrives": "true"},
-        )
-        if err:
-            return err
-        if not metadata:
-            return "No metadata found."
-
-        file_name = metadata.get("name", params.file_id)
-        mime_type = metadata.get("mimeType", "")
-        if mime_type.startswith(GOOGLE_WORKSPACE_MIME_PREFIX):
-            return (
-                f"Unsupported file type for this MCP phase: {mime_type}. "
-                "Google Docs/Sheets/Slides are handled by a separate MCP."
+        # UTF-8 needs at most 4 bytes per character, so this many bytes always cover max_chars.
+        byte_limit = params.max_chars * 4
+        # Start the download speculatively so it overlaps the metadata lookup; it is
+        # cancelled if the metadata turns out to reject the file.
+        content_task = asyncio.ensure_future(
+            _request_bytes(
+                f"/files/{params.file_id}",
+                {"alt": "media", "supportsAllDrives": "true"},
+                # One byte past the limit tells a capped download from a file that is
+                # exactly byte_limit long.
+                max_bytes=byte_limit + 1,
             )
-        if not _is_text_like_mime_type(mime_type):
-            return f"Unsupported non-text file type: {mime_type}"
-
-        content_bytes, err = await _request_bytes(
-            f"/files/{params.file_id}",
-            {"alt": "media", "supportsAllDrives": "true"},
         )
+        try:
+            # Only name and mimeType are read; the mask keeps the metadata response minimal.
+            metadata, err = await _get_file_meta(params.file_id, "name,mimeType")
+            if err:
+                return err
+            if not metadata:
+                return "No metadata found."
+
+            file_name = metadata.get("name", params.file_id)
+            mime_type = metadata.get("mimeType", "")
+            if mime_type.startswith(GOOGLE_WORKSPACE_MIME_PREFIX):
+                return (
+                    f"Unsupported file type for this MCP phase: {mime_type}. "
+                    "Google Docs/Sheets/Slides are handled by a separate MCP."
+                )
+            if not _is_text_like_mime_type(mime_type):
+                return f"Unsupported non-text file type: {mime_type}"
+
+            content_bytes, err = await content_task
+        finally:
+            await _settle_speculative_task(content_task)
         if err:
             return err
 
-        text = (content_bytes or b"").decode("utf-8", errors="replace").strip()
-        if not text:
+        content_bytes = content_bytes or b""
+        # Only the prefix was downloaded, so its length says nothing about the rest: the
+        # file is never reported empty and always marked truncated.
+        capped = len(content_bytes) > byte_limit
+        text = content_bytes.decode("utf-8", errors="replace").strip()
+        if not text and not capped:
             return f"File '{file_name}' is empty."
-        if len(text) > params.max_chars:
+        if capped or len(text) > params.max_chars:
             text = text[: params.max_chars].rstrip() + "\n\n[Truncated]"
         return f"File Content: {file_name}\n\n{text}"
     except Exception as exc:
@@ -531,16 +708,17 @@ async def read_drive_text_file(file_id: str, max_chars: int = 8000) -> str:
 async def list_shared_with_me(limit: int = 10) -> str:
     """Lists files that are shared with the authenticated user."""
     try:
-        params = _ListSharedWithMeInput.model_validate({"limit": limit})
+        if type(limit) is int and LIST_LIMIT_MIN <= limit <= LIST_LIMIT_MAX:
+            params = _ListSharedWithMeInput.model_construct(limit=limit)
+        else:
+            params = _ListSharedWithMeInput.model_validate({"limit": limit})
         data, err = await _request_json(
             "/files",
             {
-                "q": "sharedWithMe=true and trashed=false",
+                **_FILES_LIST_BASE_PARAMS,
+                "q": _SHARED_WITH_ME_QUERY,
                 "orderBy": "sharedWithMeTime desc",
                 "pageSize": params.limit,
-                "fields": "files(id,name,mimeType,modifiedTime,size,webViewLink),nextPageToken",
-                "supportsAllDrives": "true",
-                "includeItemsFromAllDrives": "true",
             },
         )
         if err:
@@ -549,8 +727,7 @@ async def list_shared_with_me(limit: int = 10) -> str:
         if not files:
             return "No shared files found."
 
-        lines = [_format_file_line(item) for item in files]
-        return f"Shared Files (showing {len(lines)}):\n" + "\n".join(lines)
+        return f"Shared Files (showing {len(files)}):\n" + _format_file_lines(files)
     except Exception as exc:
         return f"Error listing shared files: {str(exc)}"
 
@@ -603,34 +780,13 @@ async def upload_text_file(name: str, content: str, parent_id: str | None = None
         if params.parent_id:
             metadata_payload["parents"] = [params.parent_id]
 
-        created, err = await _post_json(
-            "/files",
-            params={
-                "supportsAllDrives": "true",
-                "fields": "id,name,mimeType,webViewLink",
-            },
-            json_body=metadata_payload,
-        )
+        # Metadata and content go up together; the response is the final resource.
+        latest, err = await _upload_multipart(metadata_payload, params.content)
         if err:
             return err
-        if not created or not created.get("id"):
+        if not latest or not latest.get("id"):
             return "Failed to create file metadata."
 
-        file_id = created["id"]
-        upload_err = await _upload_file_media(file_id, params.content.encode("utf-8"))
-        if upload_err:
-            return upload_err
-
-        latest, latest_err = await _request_json(
-            f"/files/{file_id}",
-            params={
-                "fields": "id,name,mimeType,size,webViewLink",
-                "supportsAllDrives": "true",
-            },
-        )
-        if latest_err and not latest:
-            latest = created
-
         return (
             "File uploaded:\n"
             f"Name: {latest.get('name', '-')}\n"
@@ -650,16 +806,15 @@ async def move_drive_file(file_id: str, new_parent_id: str) -> str:
         params = _MoveDriveFileInput.model_validate(
             {"file_id": file_id, "new_parent_id": new_parent_id}
         )
+        # Only the current parents are needed; the PATCH response carries the rest.
         item, err = await _request_json(
             f"/files/{params.file_id}",
-            params={
-                "fields": "id,name,mimeType,parents,webViewLink",
-                "supportsAllDrives": "true",
-            },
+            params={"fields": "parents", "supportsAllDrives": "true"},
         )
         if err:
             return err
-        if not item:
+        # {} is a valid reply here: items without visible parents omit the field.
+        if item is None:
             return "Drive item not found."
 
         current_parents = item.get("parents", [])
@@ -733,35 +888,35 @@ async def create_drive_shared_link_to_user(
         if params.message:
             permission_params["emailMessage"] = params.message
 
-        permission, err = await _post_json(
-            f"/files/{params.item_id}/permissions",
-            params=permission_params,
-            json_body=permission_payload,
-        )
-        shared_without_expiration = False
-        if err and "cannotSetExpiration" in err:
-            fallback_payload = {
-                "type": "user",
-                "role": normalized_role,
-                "emailAddress": params.user_email,
-            }
+        # The item lookup does not depend on the permission, so it runs alongside the
+        # permission request (and its possible no-expiration retry).
+        item_task = asyncio.ensure_future(_request_item_link(params.item_id))
+        try:
             permission, err = await _post_json(
                 f"/files/{params.item_id}/permissions",
                 params=permission_params,
-                json_body=fallback_payload,
+                json_body=permission_payload,
             )
-            if not err:
-                shared_without_expiration = True
-        if err:
-            return err
-
-        item, item_err = await _request_json(
-            f"/files/{params.item_id}",
-            params={
-                "fields": "id,name,mimeType,webViewLink",
-                "supportsAllDrives": "true",
-            },
-        )
+            shared_without_expiration = False
+            if err and "cannotSetExpiration" in err:
+                fallback_payload = {
+                    "type": "user",
+                    "role": normalized_role,
+                    "emailAddress": params.user_email,
+                }
+                permission, err = await _post_json(
+                    f"/files/{params.item_id}/permissions",
+                    params=permission_params,
+                    json_body=fallback_payload,
+                )
+                if not err:
+                    shared_without_expiration = True
+            if err:
+                return err
+
+            item, item_err = await item_task
+        finally:
+            await _settle_speculative_task(item_task)
         if item_err and not item:
             return (
                 "Permission created, but failed to fetch item metadata.\n"
@@ -816,24 +971,19 @@ async def create_drive_public_link(
             "role": normalized_role,
             "allowFileDiscovery": params.allow_discovery,
         }
-        permission, err = await _post_json(
-            f"/files/{params.item_id}/permissions",
-            params={
-                "supportsAllDrives": "true",
-                "fields": "id,type,role,allowFileDiscovery",
-            },
-            json_body=permission_payload,
+        (permission, err), (item, item_err) = await asyncio.gather(
+            _post_json(
+                f"/files/{params.item_id}/permissions",
+                params={
+                    "supportsAllDrives": "true",
+                    "fields": "id,type,role,allowFileDiscovery",
+                },
+                json_body=permission_payload,
+            ),
+            _request_item_link(params.item_id),
         )
         if err:
             return err
-
-        item, item_err = await _request_json(
-            f"/files/{params.item_id}",
-            params={
-                "fields": "id,name,mimeType,webViewLink",
-                "supportsAllDrives": "true",
-            },
-        )
         if item_err and not item:
             return (
                 "Public permission created, but failed to fetch item metadata.\n"
@@ -1,12 +1,20 @@
+import asyncio
+import binascii
+import codecs
 import email
+import functools
 import imaplib
 import os
 import smtplib
+import time
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from email.header import decode_header
+from email.iterators import typed_subpart_iterator
 from email.message import EmailMessage
 from email.mime.text import MIMEText
+from email.parser import BytesHeaderParser
 from typing import Literal
 
 from dotenv import load_dotenv
@@ -14,11 +22,45 @@ from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel, ConfigDict, Field
 
 load_dotenv()
-mcp = FastMCP("Gmail")
+
+
+@asynccontextmanager
+async def _lifespan(_server: FastMCP):
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(_close_imap_connections)
+
+
+mcp = FastMCP("Gmail", lifespan=_lifespan)
+
+IMAP_HOST = "imap.gmail.com"
+# Gmail drops idle IMAP sessions after ~30 minutes; probe before that.
+IMAP_IDLE_CHECK_SECONDS = 25 * 60
+# Keeps one FETCH command well under server request-size limits.
+IMAP_FETCH_BATCH_SIZE = 100
+# Listing tools only show these headers; PEEK keeps \Seen untouched.
+LIST_HEADER_FIELDS = "BODY.PEEK[HEADER.FIELDS (SUBJECT FROM DATE)]"
+EMAIL_COUNT_MIN = 1
+EMAIL_COUNT_MAX = 100
+EMAIL_ADDRESS_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+_LIST_FETCH_PARTS = f"({LIST_HEADER_FIELDS})"
+# The summary also needs the body's encoding to decode its raw snippet.
+_SUMMARY_FETCH_PARTS = (
+    "(BODY.PEEK[HEADER.FIELDS (SUBJECT FROM DATE CONTENT-TYPE CONTENT-TRANSFER-ENCODING)]"
+    " BODY[TEXT]<0.500>)"
+)
+_HEADER_PARSER = BytesHeaderParser()
+# account -> (connection, last_used) for the shared IMAP session.
+_IMAP_POOL: dict[str, tuple[imaplib.IMAP4_SSL, float]] = {}
+# Serialises commands on the shared socket; IMAP replies are not multiplexed.
+# imaplib blocks, so every command runs in a worker thread while this is held.
+_IMAP_LOCK = asyncio.Lock()
 
 
 class _ListRecentEmailsInput(BaseModel):
-    count: int = Field(default=5, ge=1, le=100, strict=True)
+    count: int = Field(default=5, ge=EMAIL_COUNT_MIN, le=EMAIL_COUNT_MAX, strict=True)
 
 
 class _ReadEmailInput(BaseModel):
@@ -32,11 +74,11 @@ class _SummarizeEmailsInput(BaseModel):
 
     timeframe: Literal["24h", "today", "yesterday", "week"] = "24h"
     label: str = Field(default="inbox", min_length=1)
-    count: int = Field(default=10, ge=1, le=100, strict=True)
+    count: int = Field(default=10, ge=EMAIL_COUNT_MIN, le=EMAIL_COUNT_MAX, strict=True)
 
 
 class _ListUnreadEmailsInput(BaseModel):
-    count: int = Field(default=5, ge=1, le=100, strict=True)
+    count: int = Field(default=5, ge=EMAIL_COUNT_MIN, le=EMAIL_COUNT_MAX, strict=True)
 
 
 class _MarkAsReadInput(BaseModel):
@@ -49,7 +91,7 @@ class _SearchEmailsByLabelInput(BaseModel):
     model_config = ConfigDict(str_strip_whitespace=True)
 
     label: str = Field(min_length=1)
-    count: int = Field(default=5, ge=1, le=100, strict=True)
+    count: int = Field(default=5, ge=EMAIL_COUNT_MIN, le=EMAIL_COUNT_MAX, strict=True)
 
 
 class _SearchEmailsInput(BaseModel):
@@ -61,7 +103,7 @@ class _SearchEmailsInput(BaseModel):
 class _SendEmailInput(BaseModel):
     model_config = ConfigDict(str_strip_whitespace=True)
 
-    to_email: str = Field(min_length=3, pattern=r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+    to_email: str = Field(min_length=3, pattern=EMAIL_ADDRESS_PATTERN)
     subject: str = Field(min_length=1)
     body: str = Field(default="")
 
@@ -69,7 +111,7 @@ class _SendEmailInput(BaseModel):
 class _SendCalendarInviteInput(BaseModel):
     model_config = ConfigDict(str_strip_whitespace=True)
 
-    to_email: str = Field(min_length=3, pattern=r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+    to_email: str = Field(min_length=3, pattern=EMAIL_ADDRESS_PATTERN)
     subject: str = Field(min_length=1)
     body: str = Field(default="")
     summary: str = Field(min_length=1)
@@ -79,7 +121,10 @@ class _SendCalendarInviteInput(BaseModel):
     location: str = Field(default="")
 
 
+@functools.lru_cache(maxsize=1)
 def _get_credentials() -> tuple[str, str]:
+    # .env is loaded once at import, so credentials cannot change while the
+    # server runs. Missing values raise and are therefore not cached.
     email_account = os.getenv("GOOGLE_ACCOUNT")
     app_password = os.getenv("GOOGLE_APP_KEY")
     if not email_account or not app_password:
@@ -87,23 +132,222 @@ def _get_credentials() -> tuple[str, str]:
     return email_account, app_password
 
 
+def _reset_credentials_cache() -> None:
+    _get_credentials.cache_clear()
+
+
 def _get_imap_connection():
     email_account, app_password = _get_credentials()
-    mail = imaplib.IMAP4_SSL("imap.gmail.com")
+    mail = imaplib.IMAP4_SSL(IMAP_HOST)
     mail.login(email_account, app_password)
+    # Extensions such as ESEARCH are only advertised once authenticated, and
+    # imaplib keeps the pre-login list.
+    status, data = mail.capability()
+    if status == "OK" and data and data[-1]:
+        mail.capabilities = tuple(data[-1].decode().upper().split())
     return mail
 
 
+def _logout_quietly(mail) -> None:
+    try:
+        mail.logout()
+    except Exception:
+        pass
+
+
+def _discard_imap_connection(email_account: str) -> None:
+    entry = _IMAP_POOL.pop(email_account, None)
+    if entry is not None:
+        _logout_quietly(entry[0])
+
+
+def _close_imap_connections() -> None:
+    for email_account in list(_IMAP_POOL):
+        _discard_imap_connection(email_account)
+
+
+def _pooled_imap_connection(email_account: str):
+    """Returns (connection, reused); reused is False for a fresh login."""
+    entry = _IMAP_POOL.get(email_account)
+    if entry is not None:
+        mail, last_used = entry
+        if time.monotonic() - last_used < IMAP_IDLE_CHECK_SECONDS:
+            return mail, True
+        try:
+            mail.noop()
+            return mail, True
+        except (imaplib.IMAP4.error, OSError):
+            _discard_imap_connection(email_account)
+    mail = _get_imap_connection()
+    _IMAP_POOL[email_account] = (mail, time.monotonic())
+    return mail, False
+
+
+def _logout_after(task: asyncio.Future, mail) -> None:
+    # Done callback for work abandoned by a cancelled tool call: the worker thread has
+    # finished with the socket, so the session can now be closed instead of leaked.
+    if not task.cancelled():
+        task.exception()
+    asyncio.get_running_loop().run_in_executor(None, _logout_quietly, mail)
+
+
+async def _run_imap_work(email_account: str, mail, work):
+    task = asyncio.ensure_future(asyncio.to_thread(work, mail))
+    try:
+        result = await asyncio.shield(task)
+    except asyncio.CancelledError:
+        # The worker thread may still be using the socket; never hand it out again.
+        _IMAP_POOL.pop(email_account, None)
+        task.add_done_callback(functools.partial(_logout_after, mail=mail))
+        raise
+    except (imaplib.IMAP4.error, OSError):
+        # The session state is unknown after a protocol or socket error.
+        await asyncio.to_thread(_discard_imap_connection, email_account)
+        raise
+    _IMAP_POOL[email_account] = (mail, time.monotonic())
+    return result
+
+
+async def _run_imap(work):
+    """Runs work(mail) in a worker thread on the shared IMAP session.
+
+    A pooled session can be dropped by Gmail or the network between calls. If a reused
+    one aborts, the work is retried once on a fresh login.
+    """
+    email_account, _ = _get_credentials()
+    async with _IMAP_LOCK:
+        mail, reused = await asyncio.to_thread(_pooled_imap_connection, email_account)
+        try:
+            return await _run_imap_work(email_account, mail, work)
+        except (imaplib.IMAP4.abort, OSError):
+            if not reused:
+                raise
+        mail, _ = await asyncio.to_thread(_pooled_imap_connection, email_account)
+        return await _run_imap_work(email_account, mail, work)
+
+
+def _send_smtp_message(email_account: str, app_password: str, msg) -> None:
+    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
+        server.login(email_account, app_password)
+        server.send_message(msg)
+
+
+def _esearch_all(data: list) -> bytes:
+    # "(TAG "A7") ALL 1:5,9" -> b"1:5,9"; no ALL item means no match.
+    for item in data or []:
+        if not isinstance(item, bytes):
+            continue
+        tokens = item.split()
+        for index, token in enumerate(tokens[:-1]):
+            if token.upper() == b"ALL":
+                return tokens[index + 1]
+    return b""
+
+
+def _newest_in_sequence_set(sequence_set: bytes, count: int) -> list[bytes]:
+    # Expands only the tail of a set like b"1:5,9,12:300", ascending like SEARCH.
+    ranges = []
+    for chunk in sequence_set.split(b","):
+        if not chunk:
+            continue
+        first, _, last = chunk.partition(b":")
+        low, high = sorted((int(first), int(last or first)))
+        ranges.append((low, high))
+    ranges.sort()
+    newest: list[bytes] = []
+    for low, high in reversed(ranges):
+        stop = max(low, high - (count - len(newest)) + 1)
+        newest.extend(str(number).encode() for number in range(high, stop - 1, -1))
+        if len(newest) >= count:
+            break
+    newest.reverse()
+    return newest
+
+
+def _search_newest(mail, criteria: str, count: int) -> tuple[str, list[bytes]]:
+    # ESEARCH returns matches as a compact sequence set (one range for a
+    # contiguous SINCE window) instead of one number per message.
+    if "ESEARCH" in mail.capabilities:
+        status, _ = mail.xatom("SEARCH", "RETURN (ALL)", criteria)
+        if status != "OK":
+            return status, []
+        _, data = mail.response("ESEARCH")
+        return status, _newest_in_sequence_set(_esearch_all(data), count)
+    status, messages = mail.search(None, criteria)
+    if status != "OK":
+        return status, []
+    return status, messages[0].split()[-count:]
+
+
+def _fetch_messages(
+    mail, message_ids: list[bytes], message_parts: str
+) -> dict[bytes, list[tuple[bytes, bytes]]]:
+    # One FETCH per batch instead of per message. imaplib returns the literals
+    # of all messages in one flat list; a part that starts with a sequence
+    # number opens a new message, later parts of the same message do not.
+    fetched: dict[bytes, list[tuple[bytes, bytes]]] = {}
+    for offset in range(0, len(message_ids), IMAP_FETCH_BATCH_SIZE):
+        batch = message_ids[offset : offset + IMAP_FETCH_BATCH_SIZE]
+        _, data = mail.fetch(b",".join(batch).decode(), message_parts)
+        current = None
+        for part in data or []:
+            if not isinstance(part, tuple):
+                continue
+            if part[0][:1].isdigit():
+                current = fetched.setdefault(part[0].split(None, 1)[0], [])
+            if current is not None:
+                current.append(part)
+    return fetched
+
+
 def _decode_str(value: str | None) -> str:
     if value is None:
         return ""
-    decoded = []
-    for part, charset in decode_header(value):
-        if isinstance(part, bytes):
-            decoded.append(part.decode(charset or "utf-8", errors="ignore"))
-        else:
-            decoded.append(part)
-    return "".join(decoded)
+    if isinstance(value, str) and "=?" not in value:
+        # No RFC 2047 encoded word, so decode_header would return it unchanged.
+        return value
+    return "".join(
+        part.decode(charset or "utf-8", errors="ignore") if isinstance(part, bytes) else part
+        for part, charset in decode_header(value)
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _incremental_decoder(charset: str | None):
+    # Unknown or missing MIME charsets fall back to UTF-8, and so do codecs that are
+    # not text encodings (base64, hex, zip, rot13, ...), which would not return str.
+    try:
+        codec = codecs.lookup(charset or "utf-8")
+    except LookupError:
+        codec = None
+    if codec is None or not codec._is_text_encoding:
+        codec = codecs.lookup("utf-8")
+    return codec.incrementaldecoder
+
+
+def _decode_text(payload: bytes, charset: str | None, final: bool = True) -> str:
+    # final=False drops a multibyte sequence cut off at the end of a partial fetch
+    # instead of turning it into a replacement character.
+    return _incremental_decoder(charset)(errors="replace").decode(payload, final=final)
+
+
+def _decode_snippet(raw: bytes, headers) -> str:
+    # BODY[TEXT]<0.500> is the raw start of the body. For single-part messages
+    # undo the transfer encoding and use the declared charset; a multipart body
+    # starts with MIME boundaries and is shown as is.
+    charset = None
+    if headers is not None and headers.get_content_maintype() != "multipart":
+        encoding = str(headers.get("Content-Transfer-Encoding", "")).strip().lower()
+        try:
+            if encoding == "base64":
+                compact = b"".join(raw.split())
+                raw = binascii.a2b_base64(compact[: len(compact) - len(compact) % 4])
+            elif encoding == "quoted-printable":
+                raw = binascii.a2b_qp(raw)
+        except binascii.Error:
+            pass
+        charset = headers.get_content_charset()
+    return _decode_text(raw, charset, final=False)
 
 
 def _escape_ics_text(value: str) -> str:
@@ -158,37 +402,41 @@ def _build_ics_invite(
 async def list_recent_emails(count: int = 5) -> str:
     """Lists the subjects and senders of the most recent emails in the inbox."""
     try:
-        params = _ListRecentEmailsInput.model_validate({"count": count})
+        # A plain in-range int is already what validation would produce, so skip the
+        # validator; anything else goes through it to get the usual error message.
+        if type(count) is int and EMAIL_COUNT_MIN <= count <= EMAIL_COUNT_MAX:
+            params = _ListRecentEmailsInput.model_construct(count=count)
+        else:
+            params = _ListRecentEmailsInput.model_validate({"count": count})
         count = params.count
 
-        mail = _get_imap_connection()
-        mail.select("inbox", readonly=True)
-        status, response = mail.select("inbox")
-        total_messages = int(response[0])
-
-        if total_messages == 0:
-            mail.logout()
-            return "No emails found."
-
-        start = max(1, total_messages - count + 1)
-        end = total_messages
-        status, data = mail.fetch(f"{start}:{end}", "(RFC822.HEADER)")
-
-        results = []
-        messages_data = [data[i] for i in range(len(data)) if isinstance(data[i], tuple)]
-        for i in range(len(messages_data) - 1, -1, -1):
-            msg_id_part, msg_content = messages_data[i]
-            seq_num = msg_id_part.split()[0].decode()
-            msg = email.message_from_bytes(msg_content)
-            subject = _decode_str(msg.get("Subject"))
-            sender = _decode_str(msg.get("From"))
-            date = msg.get("Date")
-            results.append(
-                f"Seq: {seq_num} | Date: {date} | From: {sender} | Subject: {subject}"
-            )
-
-        mail.logout()
-        return "\n".join(results)
+        def _work(mail):
+            status, response = mail.select("inbox", readonly=True)
+            total_messages = int(response[0])
+
+            if total_messages == 0:
+                return "No emails found."
+
+            start = max(1, total_messages - count + 1)
+            end = total_messages
+            status, data = mail.fetch(f"{start}:{end}", _LIST_FETCH_PARTS)
+
+            results = []
+            messages_data = [data[i] for i in range(len(data)) if isinstance(data[i], tuple)]
+            for i in range(len(messages_data) - 1, -1, -1):
+                msg_id_part, msg_content = messages_data[i]
+                seq_num = msg_id_part.split()[0].decode()
+                msg = _HEADER_PARSER.parsebytes(msg_content)
+                subject = _decode_str(msg.get("Subject"))
+                sender = _decode_str(msg.get("From"))
+                date = msg.get("Date")
+                results.append(
+                    f"Seq: {seq_num} | Date: {date} | From: {sender} | Subject: {subject}"
+                )
+
+            return "\n".join(results)
+
+        return await _run_imap(_work)
     except Exception as exc:
         return f"Error listing emails: {str(exc)}"
 
@@ -200,11 +448,12 @@ async def read_email(email_id: str) -> str:
         params = _ReadEmailInput.model_validate({"email_id": email_id})
         email_id = params.email_id
 
-        mail = _get_imap_connection()
-        mail.select("inbox")
-        status, data = mail.fetch(email_id, "(RFC822)")
+        def _work(mail):
+            mail.select("inbox")
+            return mail.fetch(email_id, "(RFC822)")
+
+        status, data = await _run_imap(_work)
         if status != "OK":
-            mail.logout()
             return f"Failed to fetch email ID {email_id}"
 
         msg = email.message_from_bytes(data[0][1])
@@ -213,20 +462,23 @@ async def read_email(email_id: str) -> str:
 
         body = ""
         if msg.is_multipart():
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                content_disposition = str(part.get("Content-Disposition"))
-                if content_type == "text/plain" and "attachment" not in content_disposition:
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        body = payload.decode(errors="ignore")
-                    break
+            text_part = next(
+                (
+                    part
+                    for part in typed_subpart_iterator(msg, "text", "plain")
+                    if "attachment" not in str(part.get("Content-Disposition"))
+                ),
+                None,
+            )
+            if text_part is not None:
+                payload = text_part.get_payload(decode=True)
+                if payload:
+                    body = _decode_text(payload, text_part.get_content_charset())
         else:
             payload = msg.get_payload(decode=True)
             if payload:
-                body = payload.decode(errors="ignore")
+                body = _decode_text(payload, msg.get_content_charset())
 
-        mail.logout()
         return f"From: {sender}\nSubject: {subject}\n\nContent:\n{body}"
     except Exception as exc:
         return f"Error reading email: {str(exc)}"
@@ -249,58 +501,61 @@ async def summarize_emails(timeframe: str = "24h", label: str = "inbox", count:
         label = params.label
         count = params.count
 
-        mail = _get_imap_connection()
-        quoted_label = f'"{label}"'
-        status, _ = mail.select(quoted_label, readonly=True)
-        if status != "OK":
-            mail.logout()
-            return f"Label '{label}' not found."
-
-        now = datetime.now()
-        if timeframe == "today":
-            since_date = now
-        elif timeframe == "yesterday":
-            since_date = now - timedelta(days=1)
-        elif timeframe == "week":
-            since_date = now - timedelta(days=7)
-        else:
-            since_date = now - timedelta(days=1)
-
-        date_str = since_date.strftime("%d-%b-%Y")
-        status, messages = mail.search(None, f'SINCE "{date_str}"')
-        if status != "OK":
-            mail.logout()
-            return "Failed to search emails for the given timeframe."
-
-        mail_ids = messages[0].split()
-        if not mail_ids:
-            mail.logout()
-            return f"No emails found in '{label}' for timeframe '{timeframe}'."
-
-        target_ids = mail_ids[-count:][::-1]
-        results = []
-        for m_id in target_ids:
-            status, data = mail.fetch(m_id, "(RFC822.HEADER BODY[TEXT]<0.500>)")
-            header_content = ""
-            body_snippet = ""
-            for part in data:
-                if isinstance(part, tuple):
+        def _work(mail):
+            quoted_label = f'"{label}"'
+            status, _ = mail.select(quoted_label, readonly=True)
+            if status != "OK":
+                return f"Label '{label}' not found."
+
+            now = datetime.now()
+            if timeframe == "today":
+                since_date = now
+            elif timeframe == "yesterday":
+                since_date = now - timedelta(days=1)
+            elif timeframe == "week":
+                since_date = now - timedelta(days=7)
+            else:
+                since_date = now - timedelta(days=1)
+
+            date_str = since_date.strftime("%d-%b-%Y")
+            status, mail_ids = _search_newest(mail, f'SINCE "{date_str}"', count)
+            if status != "OK":
+                return "Failed to search emails for the given timeframe."
+
+            if not mail_ids:
+                return f"No emails found in '{label}' for timeframe '{timeframe}'."
+
+            target_ids = mail_ids[::-1]
+            fetched = _fetch_messages(mail, target_ids, _SUMMARY_FETCH_PARTS)
+            results = []
+            for m_id in target_ids:
+                parts = fetched.get(m_id)
+                if not parts:
+                    continue
+                header_content = ""
+                msg = None
+                snippet_bytes = b""
+                for part in parts:
                     if b"HEADER" in part[0]:
-                        msg = email.message_from_bytes(part[1])
+                        msg = _HEADER_PARSER.parsebytes(part[1])
                         subject = _decode_str(msg.get("Subject"))
                         sender = _decode_str(msg.get("From"))
                         date = msg.get("Date")
                         header_content = f"From: {sender}\nSubject: {subject}\nDate: {date}"
                     else:
-                        body_snippet = part[1].decode(errors="ignore").strip()
-            results.append(
-                f"--- Email ID: {m_id.decode()} ---\n{header_content}\nSnippet: {body_snippet[:200]}..."
+                        snippet_bytes = part[1]
+                body_snippet = _decode_snippet(snippet_bytes, msg).strip()
+                results.append(
+                    f"--- Email ID: {m_id.decode()} ---\n{header_content}\n"
+                    f"Snippet: {body_snippet[:200]}..."
+                )
+
+            return (
+                f"Found {len(results)} emails in '{label}' from '{timeframe}':\n\n"
+                + "\n\n".join(results)
             )
 
-        mail.logout()
-        return f"Found {len(results)} emails in '{label}' from '{timeframe}':\n\n" + "\n\n".join(
-            results
-        )
+        return await _run_imap(_work)
     except Exception as exc:
         return f"Error during fetch for summary: {str(exc)}"
 
@@ -309,37 +564,41 @@ async def summarize_emails(timeframe: str = "24h", label: str = "inbox", count:
 async def list_unread_emails(count: int = 5) -> str:
     """Lists the most recent unread emails in the inbox."""
     try:
-        params = _ListUnreadEmailsInput.model_validate({"count": count})
+        if type(count) is int and EMAIL_COUNT_MIN <= count <= EMAIL_COUNT_MAX:
+            params = _ListUnreadEmailsInput.model_construct(count=count)
+        else:
+            params = _ListUnreadEmailsInput.model_validate({"count": count})
         count = params.count
 
-        mail = _get_imap_connection()
-        mail.select("inbox", readonly=True)
-
-        since_date = (datetime.now() - timedelta(days=30)).strftime("%d-%b-%Y")
-        status, messages = mail.search(None, f'UNSEEN SINCE "{since_date}"')
-        if status != "OK":
-            mail.logout()
-            return "Failed to search unread emails."
-
-        mail_ids = messages[0].split()
-        if not mail_ids:
-            mail.logout()
-            return "No unread emails found in the last 30 days."
-
-        recent_ids = mail_ids[-count:][::-1]
-        results = []
-        for m_id in recent_ids:
-            status, data = mail.fetch(m_id, "(RFC822.HEADER)")
-            msg = email.message_from_bytes(data[0][1])
-            subject = _decode_str(msg.get("Subject"))
-            sender = _decode_str(msg.get("From"))
-            date = msg.get("Date")
-            results.append(
-                f"ID: {m_id.decode()} | Date: {date} | From: {sender} | Subject: {subject}"
-            )
-
-        mail.logout()
-        return "Unread Emails (last 30 days):\n" + "\n".join(results)
+        def _work(mail):
+            mail.select("inbox", readonly=True)
+
+            since_date = (datetime.now() - timedelta(days=30)).strftime("%d-%b-%Y")
+            status, mail_ids = _search_newest(mail, f'UNSEEN SINCE "{since_date}"', count)
+            if status != "OK":
+                return "Failed to search unread emails."
+
+            if not mail_ids:
+                return "No unread emails found in the last 30 days."
+
+            recent_ids = mail_ids[::-1]
+            fetched = _fetch_messages(mail, recent_ids, _LIST_FETCH_PARTS)
+            results = []
+            for m_id in recent_ids:
+                parts = fetched.get(m_id)
+                if not parts:
+                    continue
+                msg = _HEADER_PARSER.parsebytes(parts[0][1])
+                subject = _decode_str(msg.get("Subject"))
+                sender = _decode_str(msg.get("From"))
+                date = msg.get("Date")
+                results.append(
+                    f"ID: {m_id.decode()} | Date: {date} | From: {sender} | Subject: {subject}"
+                )
+
+            return "Unread Emails (last 30 days):\n" + "\n".join(results)
+
+        return await _run_imap(_work)
     except Exception as exc:
         return f"Error listing unread emails: {str(exc)}"
 
@@ -351,13 +610,14 @@ async def mark_as_read(email_id: str) -> str:
         params = _MarkAsReadInput.model_validate({"email_id": email_id})
         email_id = params.email_id
 
-        mail = _get_imap_connection()
-        mail.select("inbox")
-        status, response = mail.store(email_id, "+FLAGS", "\\Seen")
-        mail.logout()
-        if status == "OK":
-            return f"Email {email_id} has been marked as read."
-        return f"Failed to mark email {email_id} as read."
+        def _work(mail):
+            mail.select("inbox")
+            status, response = mail.store(email_id, "+FLAGS", "\\Seen")
+            if status == "OK":
+                return f"Email {email_id} has been marked as read."
+            return f"Failed to mark email {email_id} as read."
+
+        return await _run_imap(_work)
     except Exception as exc:
         return f"Error marking email as read: {str(exc)}"
 
@@ -366,12 +626,13 @@ async def mark_as_read(email_id: str) -> str:
 async def list_labels() -> str:
     """Lists all available Gmail labels (folders)."""
     try:
-        mail = _get_imap_connection()
-        status, labels = mail.list()
-        mail.logout()
-        if status != "OK":
-            return "Failed to list labels."
-        return "\n".join(label.decode() for label in labels)
+        def _work(mail):
+            status, labels = mail.list()
+            if status != "OK":
+                return "Failed to list labels."
+            return "\n".join(label.decode() for label in labels)
+
+        return await _run_imap(_work)
     except Exception as exc:
         return f"Error listing labels: {str(exc)}"
 
@@ -384,34 +645,33 @@ async def search_emails_by_label(label: str, count: int = 5) -> str:
         label = params.label
         count = params.count
 
-        mail = _get_imap_connection()
-        quoted_label = f'"{label}"'
-        status, response = mail.select(quoted_label, readonly=True)
-        if status != "OK":
-            mail.logout()
-            return f"Label '{label}' not found or inaccessible."
-
-        total_messages = int(response[0])
-        if total_messages == 0:
-            mail.logout()
-            return f"No emails found in label '{label}'."
-
-        start = max(1, total_messages - count + 1)
-        end = total_messages
-        status, data = mail.fetch(f"{start}:{end}", "(RFC822.HEADER)")
-        messages_data = [data[i] for i in range(len(data)) if isinstance(data[i], tuple)]
-
-        results = []
-        for i in range(len(messages_data) - 1, -1, -1):
-            msg_id_part, msg_content = messages_data[i]
-            seq_num = msg_id_part.split()[0].decode()
-            msg = email.message_from_bytes(msg_content)
-            subject = _decode_str(msg.get("Subject"))
-            sender = _decode_str(msg.get("From"))
-            results.append(f"Seq: {seq_num} | From: {sender} | Subject: {subject}")
-
-        mail.logout()
-        return f"Recent emails in '{label}':\n" + "\n".join(results)
+        def _work(mail):
+            quoted_label = f'"{label}"'
+            status, response = mail.select(quoted_label, readonly=True)
+            if status != "OK":
+                return f"Label '{label}' not found or inaccessible."
+
+            total_messages = int(response[0])
+            if total_messages == 0:
+                return f"No emails found in label '{label}'."
+
+            start = max(1, total_messages - count + 1)
+            end = total_messages
+            status, data = mail.fetch(f"{start}:{end}", _LIST_FETCH_PARTS)
+            messages_data = [data[i] for i in range(len(data)) if isinstance(data[i], tuple)]
+
+            results = []
+            for i in range(len(messages_data) - 1, -1, -1):
+                msg_id_part, msg_content = messages_data[i]
+                seq_num = msg_id_part.split()[0].decode()
+                msg = _HEADER_PARSER.parsebytes(msg_content)
+                subject = _decode_str(msg.get("Subject"))
+                sender = _decode_str(msg.get("From"))
+                results.append(f"Seq: {seq_num} | From: {sender} | Subject: {subject}")
+
+            return f"Recent emails in '{label}':\n" + "\n".join(results)
+
+        return await _run_imap(_work)
     except Exception as exc:
         return f"Error searching label '{label}': {str(exc)}"
 
@@ -423,28 +683,30 @@ async def search_emails(query: str) -> str:
         params = _SearchEmailsInput.model_validate({"query": query})
         query = params.query
 
-        mail = _get_imap_connection()
-        mail.select("inbox")
-        status, messages = mail.search(None, f'TEXT "{query}"')
-        if status != "OK":
-            mail.logout()
-            return "Search failed."
-
-        mail_ids = messages[0].split()
-        if not mail_ids:
-            mail.logout()
-            return f"No emails found matching '{query}'"
-
-        results = []
-        for m_id in mail_ids[-10:][::-1]:
-            status, data = mail.fetch(m_id, "(RFC822.HEADER)")
-            msg = email.message_from_bytes(data[0][1])
-            subject = _decode_str(msg.get("Subject"))
-            sender = _decode_str(msg.get("From"))
-            results.append(f"ID: {m_id.decode()} | From: {sender} | Subject: {subject}")
-
-        mail.logout()
-        return "\n".join(results)
+        def _work(mail):
+            mail.select("inbox")
+            status, mail_ids = _search_newest(mail, f'TEXT "{query}"', 10)
+            if status != "OK":
+                return "Search failed."
+
+            if not mail_ids:
+                return f"No emails found matching '{query}'"
+
+            recent_ids = mail_ids[::-1]
+            fetched = _fetch_messages(mail, recent_ids, _LIST_FETCH_PARTS)
+            results = []
+            for m_id in recent_ids:
+                parts = fetched.get(m_id)
+                if not parts:
+                    continue
+                msg = _HEADER_PARSER.parsebytes(parts[0][1])
+                subject = _decode_str(msg.get("Subject"))
+                sender = _decode_str(msg.get("From"))
+                results.append(f"ID: {m_id.decode()} | From: {sender} | Subject: {subject}")
+
+            return "\n".join(results)
+
+        return await _run_imap(_work)
     except Exception as exc:
         return f"Error searching emails: {str(exc)}"
 
@@ -466,9 +728,7 @@ async def send_email(to_email: str, subject: str, body: str) -> str:
         msg["From"] = email_account
         msg["To"] = to_email
 
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(email_account, app_password)
-            server.send_message(msg)
+        await asyncio.to_thread(_send_smtp_message, email_account, app_password, msg)
 
         return f"Email successfully sent to {to_email}"
     except Exception as exc:
@@ -527,9 +787,7 @@ async def send_calendar_invite_email(
             params={"method": "REQUEST"},
         )
 
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(email_account, app_password)
-            server.send_message(msg)
+        await asyncio.to_thread(_send_smtp_message, email_account, app_password, msg)
 
         return f"Calendar invitation email successfully sent to {params.to_email}"
     except Exception as exc:
@@ -1,4 +1,8 @@
+import functools
+import importlib.util
 import os
+import string
+from contextlib import asynccontextmanager
 from urllib.parse import quote_plus
 from typing import Literal
 
@@ -8,10 +12,34 @@ from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel, ConfigDict, Field
 
 load_dotenv()
-mcp = FastMCP("GoogleMaps")
+
+
+@asynccontextmanager
+async def _lifespan(_server: FastMCP):
+    try:
+        yield
+    finally:
+        await _close_http_client()
+
+
+mcp = FastMCP("GoogleMaps", lifespan=_lifespan)
 
 MAPS_API_BASE = "https://maps.googleapis.com/maps/api"
 HTTP_TIMEOUT = httpx.Timeout(timeout=20.0, connect=5.0)
+HTTP_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=30.0,
+)
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+MAPS_PLACE_URL_PREFIX = "https://www.google.com/maps/place/?q=place_id:"
+MAPS_DIRECTIONS_URL_PREFIX = "https://www.google.com/maps/dir/?api=1"
+METERS_PER_MILE = 1609.344
+METERS_PER_KILOMETER = 1000.0
+# Characters quote_plus never escapes; place IDs are normally made of these only.
+_URL_SAFE_CHARS = string.ascii_letters + string.digits + "_.-~"
+
+_HTTP_CLIENT: httpx.AsyncClient | None = None
 
 
 class _SearchPlacesInput(BaseModel):
@@ -58,30 +86,58 @@ class _DirectionsInput(BaseModel):
     departure_time: str | None = Field(default=None, min_length=1)
 
 
+@functools.lru_cache(maxsize=1)
 def _get_api_key() -> str:
+    # .env is loaded once at import, so the key cannot change while the
+    # server runs. A missing key raises and is therefore not cached.
     api_key = os.getenv("GOOGLE_MAPS_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_MAPS_API_KEY must be set in .env")
     return api_key
 
 
+def _reset_credentials_cache() -> None:
+    _get_api_key.cache_clear()
+
+
 def _client_kwargs() -> dict:
-    return {"follow_redirects": True, "timeout": HTTP_TIMEOUT}
+    return {
+        "follow_redirects": True,
+        "timeout": HTTP_TIMEOUT,
+        "limits": HTTP_LIMITS,
+        "http2": HTTP2_ENABLED,
+    }
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(**_client_kwargs())
+    return _HTTP_CLIENT
+
+
+async def _close_http_client() -> None:
+    global _HTTP_CLIENT
+    client = _HTTP_CLIENT
+    _HTTP_CLIENT = None
+    if client is not None and not client.is_closed:
+        await client.aclose()
 
 
 def _maps_directions_url(origin: str, destination: str, mode: str) -> str:
+    # mode is one of the validated _DirectionsInput literals, all plain words.
     return (
-        "https://www.google.com/maps/dir/?api=1"
+        f"{MAPS_DIRECTIONS_URL_PREFIX}"
         f"&origin={quote_plus(origin)}"
         f"&destination={quote_plus(destination)}"
-        f"&travelmode={quote_plus(mode)}"
+        f"&travelmode={mode}"
     )
 
 
 def _format_distance(distance_m: int, units: str) -> str:
     if units == "imperial":
-        return f"{distance_m / 1609.344:.1f} mi"
-    return f"{distance_m / 1000.0:.1f} km"
+        return f"{distance_m / METERS_PER_MILE:.1f} mi"
+    return f"{distance_m / METERS_PER_KILOMETER:.1f} km"
 
 
 def _format_duration(duration_s: int) -> str:
@@ -108,8 +164,7 @@ async def _request_json(path: str, params: dict | None = None) -> tuple[dict | N
     query_params["key"] = _get_api_key()
     url = f"{MAPS_API_BASE}{path}"
 
-    async with httpx.AsyncClient(**_client_kwargs()) as client:
-        response = await client.get(url, params=query_params)
+    response = await _get_http_client().get(url, params=query_params)
 
     if response.status_code != 200:
         body = response.text.strip()[:300]
@@ -127,6 +182,15 @@ async def _request_json(path: str, params: dict | None = None) -> tuple[dict | N
     return payload, None
 
 
+def _place_link(place_id: str) -> str:
+    if place_id == "-":
+        return "-"
+    # quote_plus would return an all-safe ID unchanged, so skip the encode.
+    if not place_id.strip(_URL_SAFE_CHARS):
+        return MAPS_PLACE_URL_PREFIX + place_id
+    return MAPS_PLACE_URL_PREFIX + quote_plus(place_id)
+
+
 def _format_place_line(item: dict) -> str:
     name = item.get("name") or "Unknown"
     address = item.get("formatted_address") or "-"
@@ -134,11 +198,7 @@ def _format_place_line(item: dict) -> str:
     user_ratings_total = item.get("user_ratings_total", "-")
     place_id = item.get("place_id") or "-"
     types = ", ".join(item.get("types", [])[:3]) or "-"
-    maps_url = (
-        f"https://www.google.com/maps/place/?q=place_id:{quote_plus(place_id)}"
-        if place_id != "-"
-        else "-"
-    )
+    maps_url = _place_link(place_id)
     return (
         f"- {name} | Address: {address} | Rating: {rating} ({user_ratings_total}) | "
         f"Types: {types} | Place ID: {place_id} | Link: {maps_url}"
@@ -206,11 +266,7 @@ async def geocode_address(
             formatted_address = item.get("formatted_address", "-")
             place_id = item.get("place_id", "-")
             types = ", ".join(item.get("types", [])[:3]) or "-"
-            maps_url = (
-                f"https://www.google.com/maps/place/?q=place_id:{quote_plus(place_id)}"
-                if place_id != "-"
-                else "-"
-            )
+            maps_url = _place_link(place_id)
             lines.append(
                 f"- Address: {formatted_address} | LatLng: {lat}, {lng} | "
                 f"Types: {types} | Place ID: {place_id} | Link: {maps_url}"
@@ -256,11 +312,7 @@ async def reverse_geocode(
             formatted_address = item.get("formatted_address", "-")
             place_id = item.get("place_id", "-")
             types = ", ".join(item.get("types", [])[:3]) or "-"
-            maps_url = (
-                f"https://www.google.com/maps/place/?q=place_id:{quote_plus(place_id)}"
-                if place_id != "-"
-                else "-"
-            )
+            maps_url = _place_link(place_id)
             lines.append(
                 f"- Address: {formatted_address} | Types: {types} | "
                 f"Place ID: {place_id} | Link: {maps_url}"
@@ -376,21 +428,15 @@ async def get_directions(
             legs = route.get("legs", [])
             if not legs:
                 continue
-            distance_m = sum(
-                int((leg.get("distance", {}) or {}).get("value", 0))
-                for leg in legs
-                if isinstance(leg, dict)
-            )
-            duration_s = sum(
-                int((leg.get("duration", {}) or {}).get("value", 0))
-                for leg in legs
-                if isinstance(leg, dict)
-            )
-            duration_traffic_s = sum(
-                int((leg.get("duration_in_traffic", {}) or {}).get("value", 0))
-                for leg in legs
-                if isinstance(leg, dict) and leg.get("duration_in_traffic")
-            )
+            distance_m = duration_s = duration_traffic_s = 0
+            for leg in legs:
+                if not isinstance(leg, dict):
+                    continue
+                distance_m += int((leg.get("distance") or {}).get("value", 0))
+                duration_s += int((leg.get("duration") or {}).get("value", 0))
+                duration_in_traffic = leg.get("duration_in_traffic")
+                if duration_in_traffic:
+                    duration_traffic_s += int(duration_in_traffic.get("value", 0))
             start_address = legs[0].get("start_address", "-")
             end_address = legs[-1].get("end_address", "-")
             route_name = route.get("summary") or f"Route {idx}"
@@ -1,9 +1,31 @@
+import asyncio
+import os
+
+import httpx
 import pytest
 
 from chat_google.mcp_servers import docs_server
 
 
-def test_get_access_token_missing(monkeypatch):
+@pytest.fixture(autouse=True)
+def _clear_list_cache():
+    docs_server._LIST_CACHE.clear()
+    docs_server._FILE_LINK_CACHE.clear()
+    docs_server._INSERT_INDEX_CACHE.clear()
+    yield
+    docs_server._LIST_CACHE.clear()
+    docs_server._FILE_LINK_CACHE.clear()
+    docs_server._INSERT_INDEX_CACHE.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_env_credentials(monkeypatch):
+    # Tests change credentials with setenv/delenv, which the .env mtime guard cannot see.
+    monkeypatch.setattr(docs_server, "_ENV_CREDENTIALS", None)
+
+
+@pytest.mark.asyncio
+async def test_get_access_token_missing(monkeypatch):
     monkeypatch.setattr(docs_server, "load_dotenv", lambda *args, **kwargs: None)
     monkeypatch.setattr(docs_server, "_CACHED_ACCESS_TOKEN", None)
     monkeypatch.setattr(docs_server, "_CACHED_ACCESS_TOKEN_EXPIRES_AT", None)
@@ -12,10 +34,11 @@ def test_get_access_token_missing(monkeypatch):
     monkeypatch.delenv("GOOGLE_OAUTH_CLIENT_ID", raising=False)
     monkeypatch.delenv("GOOGLE_OAUTH_CLIENT_SECRET", raising=False)
     with pytest.raises(ValueError):
-        docs_server._get_access_token()
+        await docs_server._get_access_token()
 
 
-def test_get_access_token_uses_refresh_flow(monkeypatch):
+@pytest.mark.asyncio
+async def test_get_access_token_uses_refresh_flow(monkeypatch):
     monkeypatch.setattr(docs_server, "load_dotenv", lambda *args, **kwargs: None)
     monkeypatch.setattr(docs_server, "_CACHED_ACCESS_TOKEN", None)
     monkeypatch.setattr(docs_server, "_CACHED_ACCESS_TOKEN_EXPIRES_AT", None)
@@ -24,17 +47,274 @@ def test_get_access_token_uses_refresh_flow(monkeypatch):
     monkeypatch.setenv("GOOGLE_OAUTH_CLIENT_ID", "client-id")
     monkeypatch.setenv("GOOGLE_OAUTH_CLIENT_SECRET", "client-secret")
 
-    def fake_refresh_access_token(refresh_token, client_id, client_secret):
+    async def fake_refresh_access_token(refresh_token, client_id, client_secret):
         assert refresh_token == "refresh-token"
         assert client_id == "client-id"
         assert client_secret == "client-secret"
         return "refreshed-access-token", 3600
 
     monkeypatch.setattr(docs_server, "_refresh_access_token", fake_refresh_access_token)
-    token = docs_server._get_access_token()
+    token = await docs_server._get_access_token()
     assert token == "refreshed-access-token"
 
 
+@pytest.mark.asyncio
+async def test_env_credentials_reread_after_dotenv_change(monkeypatch, tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text("GOOGLE_DRIVE_ACCESS_TOKEN=first\n")
+    monkeypatch.setattr(docs_server, "load_dotenv", lambda *args, **kwargs: None)
+    monkeypatch.setattr(docs_server, "_DOTENV_PATH", str(env_file))
+    monkeypatch.setattr(docs_server, "_DOTENV_MTIME", None)
+    monkeypatch.setattr(docs_server, "_CACHED_ACCESS_TOKEN", None)
+    monkeypatch.setattr(docs_server, "_CACHED_ACCESS_TOKEN_EXPIRES_AT", None)
+    for name in (
+        "GOOGLE_DRIVE_REFRESH_TOKEN",
+        "GOOGLE_OAUTH_CLIENT_ID",
+        "GOOGLE_OAUTH_CLIENT_SECRET",
+    ):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("GOOGLE_DRIVE_ACCESS_TOKEN", "first")
+    assert await docs_server._get_access_token() == "first"
+
+    monkeypatch.setenv("GOOGLE_DRIVE_ACCESS_TOKEN", "second")
+    assert await docs_server._get_access_token() == "first"
+
+    stat = env_file.stat()
+    os.utime(env_file, (stat.st_atime, stat.st_mtime + 10))
+    assert await docs_server._get_access_token() == "second"
+
+
+@pytest.mark.asyncio
+async def test_get_access_token_concurrent_callers_refresh_once(monkeypatch):
+    monkeypatch.setattr(docs_server, "load_dotenv", lambda *args, **kwargs: None)
+    monkeypatch.setattr(docs_server, "_CACHED_ACCESS_TOKEN", None)
+    monkeypatch.setattr(docs_server, "_CACHED_ACCESS_TOKEN_EXPIRES_AT", None)
+    monkeypatch.delenv("GOOGLE_DRIVE_ACCESS_TOKEN", raising=False)
+    monkeypatch.setenv("GOOGLE_DRIVE_REFRESH_TOKEN", "refresh-token")
+    monkeypatch.setenv("GOOGLE_OAUTH_CLIENT_ID", "client-id")
+    monkeypatch.setenv("GOOGLE_OAUTH_CLIENT_SECRET", "client-secret")
+    calls = {"count": 0}
+
+    async def fake_refresh_access_token(refresh_token, client_id, client_secret):
+        calls["count"] += 1
+        await asyncio.sleep(0)
+        return "refreshed-access-token", 3600
+
+    monkeypatch.setattr(docs_server, "_refresh_access_token", fake_refresh_access_token)
+    tokens = await asyncio.gather(*[docs_server._get_access_token() for _ in range(5)])
+    assert tokens == ["refreshed-access-token"] * 5
+    assert calls["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reload_dotenv_only_when_file_changes(monkeypatch, tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text("GOOGLE_DRIVE_ACCESS_TOKEN=from-file\n")
+    loads = []
+    monkeypatch.setattr(docs_server, "load_dotenv", lambda *args, **kwargs: loads.append(args))
+    monkeypatch.setattr(docs_server, "_DOTENV_PATH", str(env_file))
+    monkeypatch.setattr(docs_server, "_DOTENV_MTIME", None)
+    monkeypatch.setattr(
+        docs_server,
+        "_REFRESH_PAYLOAD_BASE",
+        {"grant_type": "refresh_token", "client_id": "old", "client_secret": "old"},
+    )
+
+    await docs_server._reload_dotenv_if_changed()
+    await docs_server._reload_dotenv_if_changed()
+    assert len(loads) == 1
+    assert docs_server._REFRESH_PAYLOAD_BASE is None
+
+    stat = env_file.stat()
+    os.utime(env_file, (stat.st_atime, stat.st_mtime + 10))
+    await docs_server._reload_dotenv_if_changed()
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_list_cache_cleared_when_credentials_reload(monkeypatch, tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text("GOOGLE_DRIVE_REFRESH_TOKEN=account-a\n")
+    monkeypatch.setattr(docs_server, "load_dotenv", lambda *args, **kwargs: True)
+    monkeypatch.setattr(docs_server, "_DOTENV_PATH", str(env_file))
+    monkeypatch.setattr(docs_server, "_DOTENV_MTIME", None)
+    await docs_server._reload_dotenv_if_changed()
+    docs_server._LIST_CACHE[("list", 5)] = (float("inf"), "account A documents")
+
+    # Switching accounts rewrites .env.
+    stat = env_file.stat()
+    os.utime(env_file, (stat.st_atime, stat.st_mtime + 10))
+    await docs_server._reload_dotenv_if_changed()
+    assert not docs_server._LIST_CACHE
+
+
+@pytest.mark.asyncio
+async def test_authed_request_retries_once_after_401(monkeypatch):
+    class FakeResponse:
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        async def request(self, method, url, headers=None, **kwargs):
+            self.calls.append(headers["Authorization"])
+            return FakeResponse(401 if len(self.calls) == 1 else 200)
+
+    client = FakeClient()
+    tokens = iter(["stale-token", "fresh-token"])
+
+    async def fake_get_access_token():
+        return next(tokens)
+
+    monkeypatch.setattr(docs_server, "_get_http_client", lambda: client)
+    monkeypatch.setattr(docs_server, "_get_access_token", fake_get_access_token)
+    response = await docs_server._authed_request("GET", "https://docs.example.com/doc")
+    assert response.status_code == 200
+    assert client.calls == ["Bearer stale-token", "Bearer fresh-token"]
+
+
+@pytest.mark.asyncio
+async def test_docs_post_caps_writes_in_flight(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    class FakeResponse:
+        status_code = 200
+        content = b"{}"
+
+    async def fake_authed_request(method, url, headers=None, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return FakeResponse()
+
+    monkeypatch.setattr(docs_server, "_WRITE_SEMAPHORE", asyncio.Semaphore(2))
+    monkeypatch.setattr(docs_server, "_authed_request", fake_authed_request)
+    results = await asyncio.gather(
+        *(docs_server._docs_post(f"/documents/doc{i}:batchUpdate", {}) for i in range(6))
+    )
+    assert results == [({}, None)] * 6
+    assert peak == 2
+
+
+class _FakeStreamResponse:
+    def __init__(self, headers, chunks):
+        self.status_code = 200
+        self.headers = headers
+        self.chunks = chunks
+        self.body_read = False
+
+    async def aiter_bytes(self):
+        self.body_read = True
+        for chunk in self.chunks:
+            yield chunk
+
+
+class _FakeStreamClient:
+    def __init__(self, response):
+        self.response = response
+
+    def stream(self, method, url, headers=None, params=None):
+        response = self.response
+
+        class _Context:
+            async def __aenter__(self):
+                return response
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+        return _Context()
+
+
+@pytest.mark.asyncio
+async def test_drive_stream_bytes_uses_content_length_when_nothing_is_kept(monkeypatch):
+    async def fake_get_access_token():
+        return "token"
+
+    response = _FakeStreamResponse({"content-length": "5242880"}, [b"x" * 10])
+    monkeypatch.setattr(docs_server, "_get_http_client", lambda: _FakeStreamClient(response))
+    monkeypatch.setattr(docs_server, "_get_access_token", fake_get_access_token)
+    payload, size, err = await docs_server._drive_stream_bytes("/files/doc1/export", max_bytes=0)
+    assert (payload, size, err) == (b"", 5242880, None)
+    assert response.body_read is False
+
+
+@pytest.mark.asyncio
+async def test_drive_stream_bytes_counts_body_when_response_is_compressed(monkeypatch):
+    async def fake_get_access_token():
+        return "token"
+
+    response = _FakeStreamResponse(
+        {"content-length": "4", "content-encoding": "gzip"}, [b"abcdef", b"gh"]
+    )
+    monkeypatch.setattr(docs_server, "_get_http_client", lambda: _FakeStreamClient(response))
+    monkeypatch.setattr(docs_server, "_get_access_token", fake_get_access_token)
+    payload, size, err = await docs_server._drive_stream_bytes("/files/doc1/export", max_bytes=0)
+    assert (payload, size, err) == (b"", 8, None)
+
+
+class _SequencedClient:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    async def request(self, method, url, headers=None, **kwargs):
+        self.calls += 1
+
+        class Response:
+            status_code = self.statuses.pop(0)
+
+        return Response()
+
+
+@pytest.mark.asyncio
+async def test_authed_request_backs_off_on_transient_get_errors(monkeypatch):
+    async def fake_get_access_token():
+        return "token"
+
+    client = _SequencedClient([503, 429, 200])
+    monkeypatch.setattr(docs_server, "_get_http_client", lambda: client)
+    monkeypatch.setattr(docs_server, "_get_access_token", fake_get_access_token)
+    monkeypatch.setattr(docs_server, "_retry_delay", lambda attempt: 0)
+    response = await docs_server._authed_request("GET", "https://docs.example.com/doc")
+    assert response.status_code == 200
+    assert client.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_authed_request_does_not_replay_writes_after_server_error(monkeypatch):
+    async def fake_get_access_token():
+        return "token"
+
+    client = _SequencedClient([500, 200])
+    monkeypatch.setattr(docs_server, "_get_http_client", lambda: client)
+    monkeypatch.setattr(docs_server, "_get_access_token", fake_get_access_token)
+    monkeypatch.setattr(docs_server, "_retry_delay", lambda attempt: 0)
+    response = await docs_server._authed_request("POST", "https://docs.example.com/doc")
+    assert response.status_code == 500
+    assert client.calls == 1
+
+
+def test_retry_delay_is_jittered_under_the_cap():
+    for attempt in range(1, 8):
+        delay = docs_server._retry_delay(attempt)
+        assert 0 <= delay <= docs_server.HTTP_RETRY_MAX_DELAY_SECONDS
+
+
+def test_auth_headers_reused_until_token_changes(monkeypatch):
+    monkeypatch.setattr(docs_server, "_CACHED_AUTH_HEADERS", None)
+    first = docs_server._auth_headers("token-a")
+    assert docs_server._auth_headers("token-a") is first
+    second = docs_server._auth_headers("token-b")
+    assert second is not first
+    assert second == {"Authorization": "Bearer token-b"}
+
+
 @pytest.mark.asyncio
 async def test_list_docs_documents(monkeypatch):
     async def fake_drive_get(path, params=None):
@@ -60,6 +340,44 @@ async def test_list_docs_documents(monkeypatch):
     assert "doc1" in result
 
 
+@pytest.mark.asyncio
+async def test_list_docs_documents_cached_until_docs_write(monkeypatch):
+    calls = {"drive": 0}
+
+    async def fake_drive_get(path, params=None):
+        calls["drive"] += 1
+        return {"files": [{"id": "doc1", "name": "Project Plan"}]}, None
+
+    class FakeResponse:
+        status_code = 200
+        content = b"{}"
+
+    async def fake_authed_request(method, url, headers=None, **kwargs):
+        return FakeResponse()
+
+    monkeypatch.setattr(docs_server, "_drive_get", fake_drive_get)
+    monkeypatch.setattr(docs_server, "_authed_request", fake_authed_request)
+    first = await docs_server.list_docs_documents(limit=5)
+    second = await docs_server.list_docs_documents(limit=5)
+    assert first == second
+    assert calls["drive"] == 1
+
+    await docs_server._docs_post("/documents/doc1:batchUpdate", json_body={"requests": []})
+    await docs_server.list_docs_documents(limit=5)
+    assert calls["drive"] == 2
+
+
+@pytest.mark.asyncio
+async def test_list_docs_documents_rejects_out_of_range_limit(monkeypatch):
+    async def fake_drive_get(path, params=None):
+        raise AssertionError("Drive should not be called for invalid input")
+
+    monkeypatch.setattr(docs_server, "_drive_get", fake_drive_get)
+    result = await docs_server.list_docs_documents(limit=0)
+    assert result.startswith("Error listing Google Docs documents:")
+    assert "greater than or equal to 1" in result
+
+
 @pytest.mark.asyncio
 async def test_search_docs_documents_no_results(monkeypatch):
     async def fake_drive_get(path, params=None):
@@ -72,7 +390,7 @@ async def test_search_docs_documents_no_results(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_get_docs_document_metadata(monkeypatch):
-    async def fake_docs_get(path):
+    async def fake_docs_get(path, params=None):
         assert path == "/documents/doc1"
         return {"title": "Project Plan", "documentId": "doc1", "revisionId": "rev-1"}, None
 
@@ -98,7 +416,7 @@ async def test_get_docs_document_metadata(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_read_docs_document_truncated(monkeypatch):
-    async def fake_docs_get(path):
+    async def fake_docs_get(path, params=None):
         return (
             {
                 "title": "Long Doc",
@@ -117,6 +435,24 @@ async def test_read_docs_document_truncated(monkeypatch):
     assert "[Truncated]" in result
 
 
+def test_extract_document_text_stops_after_max_chars():
+    document = {
+        "body": {
+            "content": [
+                {"paragraph": {"elements": [{"textRun": {"content": "  Hello "}}]}},
+                {"paragraph": {"elements": [{"textRun": {"content": "World\n"}}]}},
+                {"paragraph": {"elements": [{"textRun": {"content": "Ignored"}}]}},
+            ]
+        }
+    }
+    assert docs_server._extract_document_text(document) == ("Hello World\nIgnored", False)
+    assert docs_server._extract_document_text(document, max_chars=8) == ("Hello Wo", True)
+    assert docs_server._extract_document_text(document, max_chars=19) == (
+        "Hello World\nIgnored",
+        False,
+    )
+
+
 @pytest.mark.asyncio
 async def test_create_docs_document_with_initial_content(monkeypatch):
     calls = []
@@ -139,7 +475,7 @@ async def test_create_docs_document_with_initial_content(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_append_docs_text(monkeypatch):
-    async def fake_docs_get(path):
+    async def fake_docs_get(path, params=None):
         return (
             {
                 "body": {
@@ -166,6 +502,83 @@ async def test_append_docs_text(monkeypatch):
     assert "Inserted At Index: 9" in result
 
 
+@pytest.mark.asyncio
+async def test_append_docs_text_reuses_index_from_previous_append(monkeypatch):
+    get_calls = []
+    posts = []
+
+    async def fake_docs_get(path, params=None):
+        get_calls.append(path)
+        return {"body": {"content": [{"endIndex": 1}, {"endIndex": 10}]}}, None
+
+    async def fake_docs_post_with_status(path, json_body=None):
+        posts.append(json_body)
+        reply = {"replies": [], "writeControl": {"requiredRevisionId": f"rev-{len(posts)}"}}
+        return reply, 200, None
+
+    monkeypatch.setattr(docs_server, "_docs_get", fake_docs_get)
+    monkeypatch.setattr(docs_server, "_docs_post_with_status", fake_docs_post_with_status)
+    await docs_server.append_docs_text("doc1", "ab\U0001F600")
+    result = await docs_server.append_docs_text("doc1", "next")
+
+    assert get_calls == ["/documents/doc1"]
+    assert posts[1]["writeControl"] == {"requiredRevisionId": "rev-1"}
+    # The emoji is two UTF-16 code units, so the second insert lands 4 units later.
+    assert posts[1]["requests"][0]["insertText"]["location"]["index"] == 13
+    assert "Inserted At Index: 13" in result
+
+
+@pytest.mark.asyncio
+async def test_append_docs_text_refetches_index_when_revision_moved(monkeypatch):
+    get_calls = []
+    posts = []
+
+    async def fake_docs_get(path, params=None):
+        get_calls.append(path)
+        return {"body": {"content": [{"endIndex": 1}, {"endIndex": 30}]}}, None
+
+    async def fake_docs_post_with_status(path, json_body=None):
+        posts.append(json_body)
+        if json_body.get("writeControl"):
+            return None, 400, "Error: Google Docs API request failed: 400 - revision mismatch."
+        return {"replies": [], "writeControl": {"requiredRevisionId": "rev-new"}}, 200, None
+
+    docs_server._INSERT_INDEX_CACHE["doc1"] = (float("inf"), "rev-old", 12)
+    monkeypatch.setattr(docs_server, "_docs_get", fake_docs_get)
+    monkeypatch.setattr(docs_server, "_docs_post_with_status", fake_docs_post_with_status)
+    result = await docs_server.append_docs_text("doc1", "x")
+
+    assert get_calls == ["/documents/doc1"]
+    assert len(posts) == 2
+    assert "writeControl" not in posts[1]
+    assert "Inserted At Index: 29" in result
+
+
+@pytest.mark.asyncio
+async def test_append_docs_text_does_not_reinsert_after_server_error(monkeypatch):
+    posts = []
+
+    class FakeResponse:
+        status_code = 500
+        content = b'{"error": {"message": "Internal error"}}'
+
+    async def fake_authed_request(method, url, headers=None, **kwargs):
+        posts.append((method, url))
+        return FakeResponse()
+
+    async def fake_docs_get(path, params=None):
+        raise AssertionError("a 5xx append may have landed, so it must not be retried")
+
+    docs_server._INSERT_INDEX_CACHE["doc1"] = (float("inf"), "rev-1", 12)
+    monkeypatch.setattr(docs_server, "_authed_request", fake_authed_request)
+    monkeypatch.setattr(docs_server, "_docs_get", fake_docs_get)
+    result = await docs_server.append_docs_text("doc1", "x")
+
+    assert len(posts) == 1
+    assert "500" in result
+    assert "doc1" not in docs_server._INSERT_INDEX_CACHE
+
+
 @pytest.mark.asyncio
 async def test_replace_docs_text(monkeypatch):
     async def fake_docs_post(path, json_body=None):
@@ -183,7 +596,7 @@ async def test_replace_docs_text(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_read_docs_document_propagates_error(monkeypatch):
-    async def fake_docs_get(path):
+    async def fake_docs_get(path, params=None):
         return None, "Error: Google Docs API request failed: 403 - forbidden"
 
     monkeypatch.setattr(docs_server, "_docs_get", fake_docs_get)
@@ -212,39 +625,112 @@ async def test_share_docs_to_user(monkeypatch):
     assert "Permission ID: perm1" in result
 
 
+@pytest.mark.asyncio
+async def test_share_docs_to_user_reports_permission_when_lookup_raises(monkeypatch):
+    async def fake_drive_post_json(path, params=None, json_body=None):
+        await asyncio.sleep(0)
+        return {"id": "perm1"}, None
+
+    async def fake_drive_get(path, params=None):
+        raise httpx.ConnectError("connection reset")
+
+    monkeypatch.setattr(docs_server, "_drive_post_json", fake_drive_post_json)
+    monkeypatch.setattr(docs_server, "_drive_get", fake_drive_get)
+    result = await docs_server.share_docs_to_user("doc1", "alice@example.com")
+    assert result.startswith("Document shared, but failed to fetch metadata.")
+    assert "Permission ID: perm1" in result
+    assert "connection reset" in result
+
+
+@pytest.mark.asyncio
+async def test_export_docs_document_survives_lookup_error(monkeypatch):
+    async def fake_drive_stream_bytes(path, params=None, max_bytes=None):
+        return b"Hello from export", 17, None
+
+    async def fake_drive_get(path, params=None):
+        raise httpx.ConnectError("connection reset")
+
+    monkeypatch.setattr(docs_server, "_drive_stream_bytes", fake_drive_stream_bytes)
+    monkeypatch.setattr(docs_server, "_drive_get", fake_drive_get)
+    result = await docs_server.export_docs_document("doc1", export_format="txt", max_chars=200)
+    assert "Google Docs export completed:" in result
+    assert "Document Name: -" in result
+    assert "Hello from export" in result
+
+
 @pytest.mark.asyncio
 async def test_export_docs_document_txt(monkeypatch):
-    async def fake_drive_get_bytes(path, params=None):
+    async def fake_drive_stream_bytes(path, params=None, max_bytes=None):
         assert path == "/files/doc1/export"
         assert params["mimeType"] == "text/plain"
-        return b"Hello from export", None
+        assert max_bytes == 800
+        return b"Hello from export", 17, None
 
     async def fake_drive_get(path, params=None):
         assert path == "/files/doc1"
         return {"name": "Project Plan", "webViewLink": "https://docs.google.com/document/d/doc1/edit"}, None
 
-    monkeypatch.setattr(docs_server, "_drive_get_bytes", fake_drive_get_bytes)
+    monkeypatch.setattr(docs_server, "_drive_stream_bytes", fake_drive_stream_bytes)
     monkeypatch.setattr(docs_server, "_drive_get", fake_drive_get)
     result = await docs_server.export_docs_document("doc1", export_format="txt", max_chars=200)
     assert "Google Docs export completed:" in result
     assert "Format: txt" in result
     assert "Hello from export" in result
+    assert "Size Bytes: 17" in result
+    assert "[Truncated]" not in result
+
+
+@pytest.mark.asyncio
+async def test_export_docs_document_txt_marks_streamed_prefix_truncated(monkeypatch):
+    async def fake_drive_stream_bytes(path, params=None, max_bytes=None):
+        return b"A" * max_bytes, 10_000, None
+
+    async def fake_drive_get(path, params=None):
+        return {"name": "Big Doc", "webViewLink": "-"}, None
+
+    monkeypatch.setattr(docs_server, "_drive_stream_bytes", fake_drive_stream_bytes)
+    monkeypatch.setattr(docs_server, "_drive_get", fake_drive_get)
+    result = await docs_server.export_docs_document("doc1", export_format="txt", max_chars=200)
+    assert "Size Bytes: 10000" in result
+    assert result.endswith("A" * 200 + "\n\n[Truncated]")
+
+
+@pytest.mark.asyncio
+async def test_export_docs_document_reuses_cached_file_link(monkeypatch):
+    meta_calls = []
+
+    async def fake_drive_stream_bytes(path, params=None, max_bytes=None):
+        return b"", 2048, None
+
+    async def fake_drive_get(path, params=None):
+        meta_calls.append(path)
+        return {"name": "Report", "webViewLink": "https://docs.google.com/document/d/doc1"}, None
+
+    monkeypatch.setattr(docs_server, "_drive_stream_bytes", fake_drive_stream_bytes)
+    monkeypatch.setattr(docs_server, "_drive_get", fake_drive_get)
+    await docs_server.export_docs_document("doc1", export_format="pdf")
+    result = await docs_server.export_docs_document("doc1", export_format="docx")
+    assert meta_calls == ["/files/doc1"]
+    assert "Document Name: Report" in result
 
 
 @pytest.mark.asyncio
 async def test_append_docs_structured_content(monkeypatch):
-    async def fake_docs_get(path):
-        assert path == "/documents/doc1"
-        return {"body": {"content": [{"endIndex": 1}, {"endIndex": 15}]}}, None
+    async def fake_docs_get(path, params=None):
+        raise AssertionError("structured append should not read the document structure")
 
     async def fake_docs_post(path, json_body=None):
         assert path == "/documents/doc1:batchUpdate"
-        text = json_body["requests"][0]["insertText"]["text"]
+        insert = json_body["requests"][0]["insertText"]
+        assert insert["endOfSegmentLocation"] == {}
+        assert "location" not in insert
+        text = insert["text"]
         assert "Agenda" in text
         assert "- Item A" in text
         assert "1. Step 1" in text
         return {"replies": []}, None
 
+    docs_server._INSERT_INDEX_CACHE["doc1"] = (float("inf"), "rev-1", 5)
     monkeypatch.setattr(docs_server, "_docs_get", fake_docs_get)
     monkeypatch.setattr(docs_server, "_docs_post", fake_docs_post)
     result = await docs_server.append_docs_structured_content(
@@ -254,15 +740,22 @@ async def test_append_docs_structured_content(monkeypatch):
         numbered_items=["Step 1"],
     )
     assert "Structured content appended to Google Docs document:" in result
+    assert "Inserted At: end of body" in result
     assert "Characters Added:" in result
+    assert "doc1" not in docs_server._INSERT_INDEX_CACHE
 
 
 @pytest.mark.asyncio
 async def test_replace_docs_text_if_revision_mismatch(monkeypatch):
-    async def fake_docs_get(path):
+    async def fake_docs_post_with_status(path, json_body=None):
+        assert json_body["writeControl"] == {"requiredRevisionId": "rev-expected"}
+        return None, 400, "Error: Google Docs API request failed: 400 - revision mismatch."
+
+    async def fake_docs_get(path, params=None):
         assert path == "/documents/doc1"
         return {"revisionId": "rev-current"}, None
 
+    monkeypatch.setattr(docs_server, "_docs_post_with_status", fake_docs_post_with_status)
     monkeypatch.setattr(docs_server, "_docs_get", fake_docs_get)
     result = await docs_server.replace_docs_text_if_revision(
         "doc1",
@@ -272,3 +765,73 @@ async def test_replace_docs_text_if_revision_mismatch(monkeypatch):
     )
     assert "Revision mismatch. No changes applied." in result
     assert "Current Revision ID: rev-current" in result
+
+
+@pytest.mark.asyncio
+async def test_replace_docs_text_if_revision_skips_get_on_success(monkeypatch):
+    async def fake_docs_post_with_status(path, json_body=None):
+        assert path == "/documents/doc1:batchUpdate"
+        assert json_body["writeControl"] == {"requiredRevisionId": "rev-1"}
+        return {"replies": [{"replaceAllText": {"occurrencesChanged": 2}}]}, 200, None
+
+    async def fake_docs_get(path, params=None):
+        raise AssertionError("revision should not be fetched when the update succeeds")
+
+    monkeypatch.setattr(docs_server, "_docs_post_with_status", fake_docs_post_with_status)
+    monkeypatch.setattr(docs_server, "_docs_get", fake_docs_get)
+    result = await docs_server.replace_docs_text_if_revision(
+        "doc1",
+        expected_revision_id="rev-1",
+        find_text="old",
+        replace_text="new",
+    )
+    assert "Safe text replacement completed" in result
+    assert "Revision ID: rev-1" in result
+    assert "Occurrences Changed: 2" in result
+
+
+@pytest.mark.asyncio
+async def test_replace_docs_text_if_revision_returns_server_error_unchanged(monkeypatch):
+    class FakeResponse:
+        status_code = 500
+        content = b'{"error": {"message": "Internal error"}}'
+
+    async def fake_authed_request(method, url, headers=None, **kwargs):
+        return FakeResponse()
+
+    async def fake_docs_get(path, params=None):
+        # A 5xx replacement may have been applied and moved the revision.
+        raise AssertionError("revision should only be compared after a 400")
+
+    monkeypatch.setattr(docs_server, "_authed_request", fake_authed_request)
+    monkeypatch.setattr(docs_server, "_docs_get", fake_docs_get)
+    result = await docs_server.replace_docs_text_if_revision(
+        "doc1",
+        expected_revision_id="rev-1",
+        find_text="old",
+        replace_text="new",
+    )
+    assert result == "Error: Google Docs API request failed: 500 - Internal error."
+
+
+def test_format_api_error_parses_google_error_body():
+    class FakeResponse:
+        status_code = 403
+        content = (
+            b'{"error": {"message": "The caller does not have permission", '
+            b'"errors": [{"reason": "forbidden"}]}}'
+        )
+
+    result = docs_server._format_api_error(FakeResponse(), "Google Docs")
+    assert result.startswith("Error: Google Docs API request failed: 403 (forbidden)")
+    assert "The caller does not have permission" in result
+    assert "Hint: ensure Google Docs API is enabled" in result
+
+
+def test_format_api_error_falls_back_to_raw_body():
+    class FakeResponse:
+        status_code = 502
+        content = b"  upstream unavailable  "
+
+    result = docs_server._format_api_error(FakeResponse(), "Drive")
+    assert result == "Error: Drive API request failed: 502 - upstream unavailable."
@@ -3,6 +3,15 @@ import pytest
 from chat_google.mcp_servers import docs_server
 
 
+@pytest.fixture(autouse=True)
+def _clear_list_cache():
+    docs_server._LIST_CACHE.clear()
+    docs_server._FILE_LINK_CACHE.clear()
+    yield
+    docs_server._LIST_CACHE.clear()
+    docs_server._FILE_LINK_CACHE.clear()
+
+
 @pytest.mark.asyncio
 async def test_docs_tools_smoke(monkeypatch):
     async def fake_drive_get(path, params=None):
@@ -46,17 +55,17 @@ async def test_docs_tools_smoke(monkeypatch):
             )
         return {}, None
 
-    async def fake_drive_get_bytes(path, params=None):
+    async def fake_drive_stream_bytes(path, params=None, max_bytes=None):
         if path == "/files/doc1/export":
-            return b"Hello from docs export", None
-        return b"", None
+            return b"Hello from docs export", 22, None
+        return b"", 0, None
 
     async def fake_drive_post_json(path, params=None, json_body=None):
         if path == "/files/doc1/permissions":
             return {"id": "perm1"}, None
         return {}, None
 
-    async def fake_docs_get(path):
+    async def fake_docs_get(path, params=None):
         return (
             {
                 "title": "Notes",
@@ -81,7 +90,7 @@ async def test_docs_tools_smoke(monkeypatch):
         return {"replies": []}, None
 
     monkeypatch.setattr(docs_server, "_drive_get", fake_drive_get)
-    monkeypatch.setattr(docs_server, "_drive_get_bytes", fake_drive_get_bytes)
+    monkeypatch.setattr(docs_server, "_drive_stream_bytes", fake_drive_stream_bytes)
     monkeypatch.setattr(docs_server, "_drive_post_json", fake_drive_post_json)
     monkeypatch.setattr(docs_server, "_docs_get", fake_docs_get)
     monkeypatch.setattr(docs_server, "_docs_post", fake_docs_post)
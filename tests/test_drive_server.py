@@ -1,8 +1,20 @@
+import asyncio
+import gc
+from datetime import datetime, timedelta, timezone
+
+import httpx
 import pytest
 
 from chat_google.mcp_servers import drive_server
 
 
+@pytest.fixture(autouse=True)
+def _clear_file_meta_cache():
+    drive_server._FILE_META_CACHE.clear()
+    yield
+    drive_server._FILE_META_CACHE.clear()
+
+
 @pytest.mark.asyncio
 async def test_list_drive_files(monkeypatch):
     async def fake_request_json(path, params=None):
@@ -52,6 +64,21 @@ async def test_list_drive_files_filters(monkeypatch):
     assert "mimeType='text/plain'" in captured["params"]["q"]
 
 
+@pytest.mark.asyncio
+async def test_list_drive_files_default_query(monkeypatch):
+    captured = {}
+
+    async def fake_request_json(path, params=None):
+        captured["params"] = params
+        return {"files": []}, None
+
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    await drive_server.list_drive_files(limit=3)
+    assert captured["params"]["q"] == "trashed=false"
+    assert captured["params"]["pageSize"] == 3
+    assert captured["params"]["orderBy"] == "modifiedTime desc"
+
+
 @pytest.mark.asyncio
 async def test_search_drive_files(monkeypatch):
     async def fake_request_json(path, params=None):
@@ -130,8 +157,9 @@ async def test_read_drive_text_file(monkeypatch):
             None,
         )
 
-    async def fake_request_bytes(path, params=None):
+    async def fake_request_bytes(path, params=None, max_bytes=None):
         assert params["alt"] == "media"
+        assert max_bytes == 801
         return b"Hello from Drive", None
 
     monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
@@ -141,6 +169,96 @@ async def test_read_drive_text_file(monkeypatch):
     assert "Hello from Drive" in result
 
 
+@pytest.mark.asyncio
+async def test_read_drive_text_file_overlaps_metadata_and_download(monkeypatch):
+    download_started = asyncio.Event()
+
+    async def fake_request_json(path, params=None):
+        await asyncio.wait_for(download_started.wait(), timeout=1)
+        return {"name": "notes.txt", "mimeType": "text/plain"}, None
+
+    async def fake_request_bytes(path, params=None, max_bytes=None):
+        download_started.set()
+        return b"Hello from Drive", None
+
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    monkeypatch.setattr(drive_server, "_request_bytes", fake_request_bytes)
+    result = await drive_server.read_drive_text_file("f-text", max_chars=200)
+    assert "Hello from Drive" in result
+
+
+@pytest.mark.asyncio
+async def test_read_drive_text_file_cancels_download_for_rejected_type(monkeypatch):
+    download_cancelled = asyncio.Event()
+
+    async def fake_request_json(path, params=None):
+        await asyncio.sleep(0)
+        return {"name": "movie.mp4", "mimeType": "video/mp4"}, None
+
+    async def fake_request_bytes(path, params=None, max_bytes=None):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            download_cancelled.set()
+            raise
+        return b"", None
+
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    monkeypatch.setattr(drive_server, "_request_bytes", fake_request_bytes)
+    result = await drive_server.read_drive_text_file("vid-1", max_chars=200)
+    assert result == "Unsupported non-text file type: video/mp4"
+    await asyncio.wait_for(download_cancelled.wait(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_read_drive_text_file_retrieves_failed_download_when_metadata_fails(monkeypatch):
+    loop_errors = []
+    loop = asyncio.get_running_loop()
+    previous_handler = loop.get_exception_handler()
+    loop.set_exception_handler(lambda _loop, context: loop_errors.append(context))
+
+    async def fake_request_json(path, params=None):
+        await asyncio.sleep(0)
+        return None, "Error: Drive API request failed: 404 - File not found."
+
+    async def fake_request_bytes(path, params=None, max_bytes=None):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    monkeypatch.setattr(drive_server, "_request_bytes", fake_request_bytes)
+    try:
+        result = await drive_server.read_drive_text_file("missing-1", max_chars=200)
+        gc.collect()
+    finally:
+        loop.set_exception_handler(previous_handler)
+    assert result == "Error: Drive API request failed: 404 - File not found."
+    assert loop_errors == []
+
+
+@pytest.mark.asyncio
+async def test_file_metadata_lookups_are_cached_per_fields(monkeypatch):
+    calls = []
+
+    async def fake_request_json(path, params=None):
+        calls.append((path, params["fields"]))
+        return {"id": "file-1", "name": "plan.txt", "mimeType": "text/plain"}, None
+
+    async def fake_request_bytes(path, params=None, max_bytes=None):
+        return b"plan", None
+
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    monkeypatch.setattr(drive_server, "_request_bytes", fake_request_bytes)
+    await drive_server.read_drive_text_file("file-1", max_chars=200)
+    result = await drive_server.read_drive_text_file("file-1", max_chars=200)
+    await drive_server._request_item_link("file-1")
+
+    assert "File Content: plan.txt" in result
+    assert calls == [
+        ("/files/file-1", "name,mimeType"),
+        ("/files/file-1", "id,name,mimeType,webViewLink"),
+    ]
+
+
 @pytest.mark.asyncio
 async def test_read_drive_text_file_reject_workspace_doc(monkeypatch):
     async def fake_request_json(path, params=None):
@@ -190,7 +308,7 @@ async def test_read_drive_text_file_truncated(monkeypatch):
             None,
         )
 
-    async def fake_request_bytes(path, params=None):
+    async def fake_request_bytes(path, params=None, max_bytes=None):
         return (b"a" * 500), None
 
     monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
@@ -200,6 +318,82 @@ async def test_read_drive_text_file_truncated(monkeypatch):
     assert "[Truncated]" in result
 
 
+@pytest.mark.asyncio
+async def test_read_drive_text_file_capped_read_is_never_empty(monkeypatch):
+    async def fake_request_json(path, params=None):
+        return {"id": "log-1", "name": "padded.log", "mimeType": "text/plain"}, None
+
+    async def fake_request_bytes(path, params=None, max_bytes=None):
+        # The capped prefix is blank lines; the real content comes later in the file.
+        return b"\n" * max_bytes, None
+
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    monkeypatch.setattr(drive_server, "_request_bytes", fake_request_bytes)
+    result = await drive_server.read_drive_text_file("log-1", max_chars=200)
+    assert "is empty" not in result
+    assert result.startswith("File Content: padded.log")
+    assert result.endswith("[Truncated]")
+
+
+@pytest.mark.asyncio
+async def test_read_drive_text_file_marks_capped_prefix_truncated_after_strip(monkeypatch):
+    async def fake_request_json(path, params=None):
+        return {"id": "pad-1", "name": "notes.txt", "mimeType": "text/plain"}, None
+
+    async def fake_request_bytes(path, params=None, max_bytes=None):
+        # Stripping the padded prefix leaves fewer than max_chars characters.
+        return (b"header" + b" " * max_bytes)[:max_bytes], None
+
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    monkeypatch.setattr(drive_server, "_request_bytes", fake_request_bytes)
+    result = await drive_server.read_drive_text_file("pad-1", max_chars=200)
+    assert result == "File Content: notes.txt\n\nheader\n\n[Truncated]"
+
+
+@pytest.mark.asyncio
+async def test_read_drive_text_file_exact_limit_is_not_truncated(monkeypatch):
+    async def fake_request_json(path, params=None):
+        return {"id": "f-1", "name": "exact.txt", "mimeType": "text/plain"}, None
+
+    async def fake_request_bytes(path, params=None, max_bytes=None):
+        return b"a" * 800, None
+
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    monkeypatch.setattr(drive_server, "_request_bytes", fake_request_bytes)
+    result = await drive_server.read_drive_text_file("f-1", max_chars=800)
+    assert result == "File Content: exact.txt\n\n" + "a" * 800
+
+
+@pytest.mark.asyncio
+async def test_request_bytes_stops_reading_at_cap(monkeypatch):
+    chunks_read = []
+
+    class FakeStreamResponse:
+        status_code = 200
+
+        async def aiter_bytes(self):
+            for chunk in (b"abcd", b"efgh", b"ijkl", b"mnop"):
+                chunks_read.append(chunk)
+                yield chunk
+
+    class FakeStreamContext:
+        async def __aenter__(self):
+            return FakeStreamResponse()
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    class FakeClient:
+        def stream(self, method, url, headers=None, params=None):
+            return FakeStreamContext()
+
+    monkeypatch.setattr(drive_server, "_get_http_client", lambda: FakeClient())
+    monkeypatch.setattr(drive_server, "_get_access_token", lambda: "token")
+    content, err = await drive_server._request_bytes("/files/f1", {"alt": "media"}, max_bytes=6)
+    assert (content, err) == (b"abcdef", None)
+    assert chunks_read == [b"abcd", b"efgh"]
+
+
 @pytest.mark.asyncio
 async def test_list_shared_with_me(monkeypatch):
     async def fake_request_json(path, params=None):
@@ -233,6 +427,62 @@ async def test_drive_validation_error_limit():
     assert "greater than or equal to 1" in result
 
 
+@pytest.mark.asyncio
+async def test_list_shared_with_me_validation_error_limit():
+    result = await drive_server.list_shared_with_me(limit=101)
+    assert result.startswith("Error listing shared files:")
+    assert "less than or equal to 100" in result
+
+
+def test_format_drive_error_forbidden_adds_scope_hint():
+    class FakeResponse:
+        status_code = 403
+        content = (
+            b'{"error": {"message": "Insufficient permissions",'
+            b' "errors": [{"reason": "insufficientFilePermissions"}]}}'
+        )
+
+    message = drive_server._format_drive_error(FakeResponse())
+    assert message.startswith(
+        "Error: Drive API request failed: 403 (insufficientFilePermissions) - "
+        "Insufficient permissions."
+    )
+    assert message.endswith(drive_server.DRIVE_FORBIDDEN_HINT.strip())
+
+
+def test_format_drive_error_non_json_body():
+    class FakeResponse:
+        status_code = 502
+        content = b"  <html>Bad Gateway</html>  "
+
+    message = drive_server._format_drive_error(FakeResponse())
+    assert message == "Error: Drive API request failed: 502 - <html>Bad Gateway</html>."
+
+
+def test_to_rfc3339_after_days_is_utc_second_precision():
+    value = drive_server._to_rfc3339_after_days(7)
+    parsed = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    delta = parsed - datetime.now(timezone.utc)
+    assert timedelta(days=6, hours=23) < delta <= timedelta(days=7)
+
+
+def test_is_text_like_mime_type_ignores_case():
+    assert drive_server._is_text_like_mime_type("text/plain")
+    assert drive_server._is_text_like_mime_type("Text/CSV")
+    assert drive_server._is_text_like_mime_type("APPLICATION/JSON")
+    assert not drive_server._is_text_like_mime_type("image/png")
+    assert not drive_server._is_text_like_mime_type("Image/PNG")
+
+
+def test_auth_headers_reused_until_token_changes(monkeypatch):
+    monkeypatch.setattr(drive_server, "_CACHED_AUTH_HEADERS", None)
+    first = drive_server._auth_headers("token-a")
+    assert drive_server._auth_headers("token-a") is first
+    second = drive_server._auth_headers("token-b")
+    assert second is not first
+    assert second == {"Authorization": "Bearer token-b"}
+
+
 def test_get_access_token_missing(monkeypatch):
     monkeypatch.delenv("GOOGLE_DRIVE_ACCESS_TOKEN", raising=False)
     monkeypatch.delenv("GOOGLE_DRIVE_REFRESH_TOKEN", raising=False)
@@ -334,24 +584,9 @@ async def test_create_drive_folder(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_upload_text_file(monkeypatch):
-    async def fake_post_json(path, params=None, json_body=None):
-        assert path == "/files"
-        return (
-            {
-                "id": "file-123",
-                "name": "notes.txt",
-                "mimeType": "text/plain",
-                "webViewLink": "https://drive.google.com/file/d/file-123/view",
-            },
-            None,
-        )
-
-    async def fake_upload_media(file_id, content, content_type="text/plain; charset=utf-8"):
-        assert file_id == "file-123"
-        assert b"hello world" in content
-        return None
-
-    async def fake_request_json(path, params=None):
+    async def fake_upload_multipart(metadata, content, content_type="text/plain; charset=utf-8"):
+        assert metadata == {"name": "notes.txt", "mimeType": "text/plain", "parents": ["parent-1"]}
+        assert content == "hello world"
         return (
             {
                 "id": "file-123",
@@ -363,15 +598,33 @@ async def test_upload_text_file(monkeypatch):
             None,
         )
 
+    async def fake_post_json(path, params=None, json_body=None):
+        raise AssertionError("metadata and content should be uploaded in one request")
+
+    monkeypatch.setattr(drive_server, "_upload_multipart", fake_upload_multipart)
     monkeypatch.setattr(drive_server, "_post_json", fake_post_json)
-    monkeypatch.setattr(drive_server, "_upload_file_media", fake_upload_media)
-    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
 
     result = await drive_server.upload_text_file("notes.txt", "hello world", parent_id="parent-1")
     assert "File uploaded:" in result
+    assert "ID: file-123" in result
     assert "Size: 11" in result
 
 
+def test_multipart_related_body_layout():
+    body, boundary = drive_server._multipart_related_body(
+        {"name": "notes.txt"}, "héllo\r\n", "text/plain; charset=utf-8"
+    )
+    parts = body.split(f"--{boundary}".encode("ascii"))
+    assert parts[0] == b""
+    assert parts[-1] == b"--"
+    meta_part, media_part = parts[1], parts[2]
+    assert meta_part.startswith(b"\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n")
+    assert meta_part.endswith(b"\r\n")
+    assert b'"name":"notes.txt"' in meta_part
+    media_header = b"\r\nContent-Type: text/plain; charset=utf-8\r\n\r\n"
+    assert media_part == media_header + "héllo\r\n".encode("utf-8") + b"\r\n"
+
+
 @pytest.mark.asyncio
 async def test_move_drive_file(monkeypatch):
     calls = {"patch_params": None}
@@ -453,6 +706,50 @@ async def test_create_drive_shared_link_to_user_default_expiry(monkeypatch):
     assert captured["params"]["sendNotificationEmail"] == "true"
 
 
+@pytest.mark.asyncio
+async def test_create_drive_shared_link_to_user_overlaps_item_lookup(monkeypatch):
+    lookup_started = asyncio.Event()
+
+    async def fake_post_json(path, params=None, json_body=None):
+        await asyncio.wait_for(lookup_started.wait(), timeout=1)
+        return {"id": "perm-1", "role": "reader", "emailAddress": "user@example.com"}, None
+
+    async def fake_request_json(path, params=None):
+        lookup_started.set()
+        return {"id": "file-1", "name": "plan.txt", "webViewLink": "https://drive/x"}, None
+
+    monkeypatch.setattr(drive_server, "_post_json", fake_post_json)
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    result = await drive_server.create_drive_shared_link_to_user("file-1", "user@example.com")
+    assert "Drive shared link created for user:" in result
+    assert "Item: plan.txt" in result
+
+
+@pytest.mark.asyncio
+async def test_create_drive_shared_link_to_user_retrieves_failed_lookup(monkeypatch):
+    loop_errors = []
+    loop = asyncio.get_running_loop()
+    previous_handler = loop.get_exception_handler()
+    loop.set_exception_handler(lambda _loop, context: loop_errors.append(context))
+
+    async def fake_post_json(path, params=None, json_body=None):
+        await asyncio.sleep(0)
+        return None, "Error: Drive API request failed: 403 - Insufficient permissions."
+
+    async def fake_request_json(path, params=None):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(drive_server, "_post_json", fake_post_json)
+    monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
+    try:
+        result = await drive_server.create_drive_shared_link_to_user("file-1", "user@example.com")
+        gc.collect()
+    finally:
+        loop.set_exception_handler(previous_handler)
+    assert result == "Error: Drive API request failed: 403 - Insufficient permissions."
+    assert loop_errors == []
+
+
 @pytest.mark.asyncio
 async def test_create_drive_shared_link_to_user_invalid_role():
     result = await drive_server.create_drive_shared_link_to_user(
@@ -3,6 +3,13 @@ import pytest
 from chat_google.mcp_servers import drive_server
 
 
+@pytest.fixture(autouse=True)
+def _clear_file_meta_cache():
+    drive_server._FILE_META_CACHE.clear()
+    yield
+    drive_server._FILE_META_CACHE.clear()
+
+
 @pytest.mark.asyncio
 async def test_drive_tools_smoke(monkeypatch):
     async def fake_request_json(path, params=None):
@@ -113,17 +120,18 @@ async def test_drive_tools_smoke(monkeypatch):
             None,
         )
 
-    async def fake_request_bytes(path, params=None):
+    async def fake_request_bytes(path, params=None, max_bytes=None):
         return b"alpha content", None
 
-    async def fake_upload_file_media(file_id, content, content_type="text/plain; charset=utf-8"):
-        return None
+    async def fake_upload_multipart(metadata, content, content_type="text/plain; charset=utf-8"):
+        uploaded = {"id": "file-new", "name": metadata["name"], "mimeType": "text/plain"}
+        return {**uploaded, "size": str(len(content))}, None
 
     monkeypatch.setattr(drive_server, "_request_json", fake_request_json)
     monkeypatch.setattr(drive_server, "_post_json", fake_post_json)
     monkeypatch.setattr(drive_server, "_patch_json", fake_patch_json)
     monkeypatch.setattr(drive_server, "_request_bytes", fake_request_bytes)
-    monkeypatch.setattr(drive_server, "_upload_file_media", fake_upload_file_media)
+    monkeypatch.setattr(drive_server, "_upload_multipart", fake_upload_multipart)
 
     list_res = await drive_server.list_drive_files(limit=5)
     search_res = await drive_server.search_drive_files("alpha", limit=5)
@@ -1,3 +1,7 @@
+import asyncio
+import base64
+import imaplib
+import threading
 from email.message import EmailMessage
 
 import pytest
@@ -5,6 +9,15 @@ import pytest
 from chat_google.mcp_servers import gmail_server
 
 
+@pytest.fixture(autouse=True)
+def _clear_imap_pool():
+    gmail_server._IMAP_POOL.clear()
+    gmail_server._reset_credentials_cache()
+    yield
+    gmail_server._IMAP_POOL.clear()
+    gmail_server._reset_credentials_cache()
+
+
 def _header_bytes(subject: str, sender: str, date: str = "Fri, 01 Jan 2026 10:00:00 +0000"):
     return (
         f"Subject: {subject}\r\n"
@@ -24,15 +37,21 @@ def _full_email_bytes(subject: str, sender: str, body: str):
 
 @pytest.mark.asyncio
 async def test_list_recent_emails(monkeypatch):
+    selects = []
+
     class FakeMail:
         def select(self, mailbox, readonly=False):
+            selects.append((mailbox, readonly))
             return "OK", [b"2"]
 
         def fetch(self, sequence, fields):
             assert sequence == "1:2"
+            assert fields == "(BODY.PEEK[HEADER.FIELDS (SUBJECT FROM DATE)])"
+            header_prefix = b" (BODY[HEADER.FIELDS (SUBJECT FROM DATE)] {80}"
             return "OK", [
-                (b"1 (RFC822.HEADER)", _header_bytes("Old", "old@example.com")),
-                (b"2 (RFC822.HEADER)", _header_bytes("New", "new@example.com")),
+                (b"1" + header_prefix, _header_bytes("Old", "old@example.com")),
+                b")",
+                (b"2" + header_prefix, _header_bytes("New", "new@example.com")),
                 b")",
             ]
 
@@ -41,6 +60,7 @@ async def test_list_recent_emails(monkeypatch):
 
     monkeypatch.setattr(gmail_server, "_get_imap_connection", lambda: FakeMail())
     result = await gmail_server.list_recent_emails(count=2)
+    assert selects == [("inbox", True)]
     assert "Subject: New" in result
     assert "Subject: Old" in result
     assert "Seq: 2" in result
@@ -67,9 +87,33 @@ async def test_read_email(monkeypatch):
     assert "Body content" in result
 
 
+@pytest.mark.asyncio
+async def test_read_email_picks_first_inline_text_part(monkeypatch):
+    message = EmailMessage()
+    message["Subject"] = "Report"
+    message["From"] = "alice@example.com"
+    message.set_content("<p>Body html</p>", subtype="html")
+    message.add_attachment("attached notes", filename="notes.txt")
+    message.add_attachment("Body text")
+    message.get_payload()[-1].replace_header("Content-Disposition", "inline")
+
+    class FakeMail:
+        def select(self, mailbox):
+            return "OK", [b""]
+
+        def fetch(self, email_id, fields):
+            return "OK", [(b"10 (RFC822)", message.as_bytes())]
+
+    monkeypatch.setattr(gmail_server, "_get_imap_connection", lambda: FakeMail())
+    result = await gmail_server.read_email("10")
+    assert result.endswith("Content:\nBody text\n")
+
+
 @pytest.mark.asyncio
 async def test_summarize_emails(monkeypatch):
     class FakeMail:
+        capabilities = ("IMAP4REV1",)
+
         def select(self, mailbox, readonly=False):
             return "OK", [b""]
 
@@ -77,12 +121,19 @@ async def test_summarize_emails(monkeypatch):
             assert "SINCE" in query
             return "OK", [b"11 22"]
 
-        def fetch(self, email_id, fields):
-            header = _header_bytes(f"Subject {email_id.decode()}", "sender@example.com")
+        def fetch(self, message_set, fields):
+            assert message_set == "22,11"
+            assert "HEADER.FIELDS (SUBJECT FROM DATE CONTENT-TYPE" in fields
+            assert "BODY[TEXT]<0.500>" in fields
             snippet = b"This is a snippet from the email body."
+            header_prefix = b" (BODY[HEADER.FIELDS (SUBJECT FROM DATE)] {80}"
             return "OK", [
-                (b"22 (RFC822.HEADER)", header),
-                (b"22 (BODY[TEXT]<0>)", snippet),
+                (b"11" + header_prefix, _header_bytes("Subject 11", "sender@example.com")),
+                (b" BODY[TEXT]<0> {38}", snippet),
+                b")",
+                (b"22" + header_prefix, _header_bytes("Subject 22", "sender@example.com")),
+                (b" BODY[TEXT]<0> {38}", snippet),
+                b")",
             ]
 
         def logout(self):
@@ -92,20 +143,25 @@ async def test_summarize_emails(monkeypatch):
     result = await gmail_server.summarize_emails(timeframe="24h", label="inbox", count=2)
     assert "Found 2 emails" in result
     assert "Email ID: 22" in result
-    assert "Snippet:" in result
+    assert "Snippet: This is a snippet" in result
+    assert result.index("Subject: Subject 22") < result.index("Subject: Subject 11")
 
 
 @pytest.mark.asyncio
 async def test_list_unread_emails(monkeypatch):
     class FakeMail:
+        capabilities = ("IMAP4REV1",)
+
         def select(self, mailbox, readonly=False):
             return "OK", [b""]
 
         def search(self, charset, query):
             return "OK", [b"31 32"]
 
-        def fetch(self, email_id, fields):
-            return "OK", [(b"", _header_bytes("Unread", "noreply@example.com"))]
+        def fetch(self, message_set, fields):
+            assert message_set == "32"
+            header = _header_bytes("Unread", "noreply@example.com")
+            return "OK", [(b"32 (RFC822.HEADER {60}", header), b")"]
 
         def logout(self):
             return None
@@ -173,6 +229,8 @@ async def test_search_emails_by_label(monkeypatch):
 @pytest.mark.asyncio
 async def test_search_emails(monkeypatch):
     class FakeMail:
+        capabilities = ("IMAP4REV1",)
+
         def select(self, mailbox):
             return "OK", [b""]
 
@@ -180,8 +238,14 @@ async def test_search_emails(monkeypatch):
             assert 'TEXT "sumopod"' in query
             return "OK", [b"9 10"]
 
-        def fetch(self, email_id, fields):
-            return "OK", [(b"", _header_bytes("Match", "bot@example.com"))]
+        def fetch(self, message_set, fields):
+            assert message_set == "10,9"
+            return "OK", [
+                (b"9 (RFC822.HEADER {60}", _header_bytes("Older", "bot@example.com")),
+                b")",
+                (b"10 (RFC822.HEADER {60}", _header_bytes("Match", "bot@example.com")),
+                b")",
+            ]
 
         def logout(self):
             return None
@@ -190,6 +254,7 @@ async def test_search_emails(monkeypatch):
     result = await gmail_server.search_emails("sumopod")
     assert "ID: 10" in result
     assert "Subject: Match" in result
+    assert result.index("ID: 10") < result.index("ID: 9")
 
 
 @pytest.mark.asyncio
@@ -279,3 +344,292 @@ async def test_list_recent_emails_invalid_count(monkeypatch):
     result = await gmail_server.list_recent_emails(count=0)
     assert result.startswith("Error listing emails:")
     assert "greater than or equal to 1" in result
+
+
+class _PooledFakeMail:
+    def __init__(self):
+        self.logouts = 0
+        self.noops = 0
+
+    def list(self):
+        return "OK", [b'(\\HasNoChildren) "/" "INBOX"']
+
+    def noop(self):
+        self.noops += 1
+        return "OK", [b""]
+
+    def logout(self):
+        self.logouts += 1
+        return "BYE", [b""]
+
+
+@pytest.mark.asyncio
+async def test_imap_connection_is_reused_across_calls(monkeypatch):
+    created = []
+
+    def fake_connect():
+        created.append(_PooledFakeMail())
+        return created[-1]
+
+    monkeypatch.setattr(gmail_server, "_get_imap_connection", fake_connect)
+    assert "INBOX" in await gmail_server.list_labels()
+    assert "INBOX" in await gmail_server.list_labels()
+    assert len(created) == 1
+    assert created[0].logouts == 0
+
+    gmail_server._close_imap_connections()
+    assert created[0].logouts == 1
+    assert gmail_server._IMAP_POOL == {}
+
+
+@pytest.mark.asyncio
+async def test_imap_connection_is_probed_after_idle(monkeypatch):
+    created = []
+
+    def fake_connect():
+        created.append(_PooledFakeMail())
+        return created[-1]
+
+    monkeypatch.setattr(gmail_server, "_get_imap_connection", fake_connect)
+    await gmail_server.list_labels()
+    mail, last_used = gmail_server._IMAP_POOL["tester@example.com"]
+    gmail_server._IMAP_POOL["tester@example.com"] = (
+        mail,
+        last_used - gmail_server.IMAP_IDLE_CHECK_SECONDS - 1,
+    )
+
+    await gmail_server.list_labels()
+    assert len(created) == 1
+    assert created[0].noops == 1
+
+
+@pytest.mark.asyncio
+async def test_imap_connection_is_dropped_after_abort(monkeypatch):
+    created = []
+
+    class AbortingMail(_PooledFakeMail):
+        def list(self):
+            raise imaplib.IMAP4.abort("socket error: EOF")
+
+    def fake_connect():
+        mail = AbortingMail() if not created else _PooledFakeMail()
+        created.append(mail)
+        return mail
+
+    monkeypatch.setattr(gmail_server, "_get_imap_connection", fake_connect)
+    result = await gmail_server.list_labels()
+    assert result.startswith("Error listing labels:")
+    assert created[0].logouts == 1
+    assert gmail_server._IMAP_POOL == {}
+
+    assert "INBOX" in await gmail_server.list_labels()
+    assert len(created) == 2
+
+
+@pytest.mark.asyncio
+async def test_dropped_pooled_connection_is_replaced_and_retried(monkeypatch):
+    created = []
+
+    class DroppedMail(_PooledFakeMail):
+        def __init__(self):
+            super().__init__()
+            self.dropped = False
+
+        def list(self):
+            if self.dropped:
+                raise imaplib.IMAP4.abort("command: LIST => socket error: EOF")
+            return super().list()
+
+    def fake_connect():
+        created.append(DroppedMail())
+        return created[-1]
+
+    monkeypatch.setattr(gmail_server, "_get_imap_connection", fake_connect)
+    assert "INBOX" in await gmail_server.list_labels()
+    # Gmail closes the idle session before the next call (BYE, NAT timeout, sleep).
+    created[0].dropped = True
+
+    assert "INBOX" in await gmail_server.list_labels()
+    assert len(created) == 2
+    assert created[0].logouts == 1
+    assert gmail_server._IMAP_POOL["tester@example.com"][0] is created[1]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_imap_call_logs_out_after_worker_finishes(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    created = []
+
+    class SlowMail(_PooledFakeMail):
+        def list(self):
+            started.set()
+            release.wait(timeout=5)
+            return super().list()
+
+    def fake_connect():
+        created.append(SlowMail())
+        return created[-1]
+
+    monkeypatch.setattr(gmail_server, "_get_imap_connection", fake_connect)
+    call = asyncio.ensure_future(gmail_server.list_labels())
+    await asyncio.to_thread(started.wait, 5)
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+
+    assert gmail_server._IMAP_POOL == {}
+    assert created[0].logouts == 0
+    release.set()
+    for _ in range(100):
+        if created[0].logouts:
+            break
+        await asyncio.sleep(0.01)
+    assert created[0].logouts == 1
+
+
+@pytest.mark.asyncio
+async def test_imap_commands_run_off_the_event_loop(monkeypatch):
+    command_threads = []
+
+    class ThreadRecordingMail(_PooledFakeMail):
+        def list(self):
+            command_threads.append(threading.get_ident())
+            return super().list()
+
+    monkeypatch.setattr(gmail_server, "_get_imap_connection", ThreadRecordingMail)
+    assert "INBOX" in await gmail_server.list_labels()
+    assert command_threads
+    assert command_threads[0] != threading.get_ident()
+
+
+def test_fetch_messages_batches_and_groups_by_sequence_number():
+    calls = []
+
+    class FakeMail:
+        def fetch(self, message_set, fields):
+            calls.append(message_set)
+            data = []
+            for seq in message_set.split(","):
+                data.append((f"{seq} (FLAGS () RFC822.HEADER {{10}}".encode(), b"h" + seq.encode()))
+                data.append((b" BODY[TEXT]<0> {4}", b"b" + seq.encode()))
+                data.append(b")")
+            data.append(b"7 (FLAGS (\\Seen))")
+            return "OK", data
+
+    ids = [str(i).encode() for i in range(1, 151)]
+    fetched = gmail_server._fetch_messages(FakeMail(), ids, "(RFC822.HEADER BODY[TEXT])")
+
+    assert len(calls) == 2
+    assert calls[0].count(",") == gmail_server.IMAP_FETCH_BATCH_SIZE - 1
+    assert len(fetched) == 150
+    assert [content for _, content in fetched[b"42"]] == [b"h42", b"b42"]
+
+
+def test_credentials_are_read_once(monkeypatch):
+    assert gmail_server._get_credentials() == ("tester@example.com", "app-password")
+    monkeypatch.setenv("GOOGLE_ACCOUNT", "other@example.com")
+    assert gmail_server._get_credentials() == ("tester@example.com", "app-password")
+
+    gmail_server._reset_credentials_cache()
+    assert gmail_server._get_credentials() == ("other@example.com", "app-password")
+
+
+def test_missing_credentials_are_not_cached(monkeypatch):
+    monkeypatch.delenv("GOOGLE_APP_KEY", raising=False)
+    with pytest.raises(ValueError):
+        gmail_server._get_credentials()
+
+    monkeypatch.setenv("GOOGLE_APP_KEY", "app-password")
+    assert gmail_server._get_credentials() == ("tester@example.com", "app-password")
+
+
+def test_decode_str_skips_decode_header_for_plain_values(monkeypatch):
+    assert gmail_server._decode_str("=?utf-8?q?caf=C3=A9?= menu") == "café menu"
+
+    def fail_decode_header(value):
+        raise AssertionError("plain headers must not be decoded")
+
+    monkeypatch.setattr(gmail_server, "decode_header", fail_decode_header)
+    assert gmail_server._decode_str("Weekly report") == "Weekly report"
+    assert gmail_server._decode_str(None) == ""
+
+
+@pytest.mark.asyncio
+async def test_list_unread_emails_uses_esearch_sequence_set(monkeypatch):
+    class FakeMail:
+        capabilities = ("IMAP4REV1", "ESEARCH")
+
+        def select(self, mailbox, readonly=False):
+            return "OK", [b""]
+
+        def search(self, charset, query):
+            raise AssertionError("plain SEARCH must not be used when ESEARCH is available")
+
+        def xatom(self, name, *args):
+            assert name == "SEARCH"
+            assert args[0] == "RETURN (ALL)"
+            assert args[1].startswith("UNSEEN SINCE")
+            return "OK", [b"SEARCH completed"]
+
+        def response(self, code):
+            assert code == "ESEARCH"
+            return code, [b'(TAG "A7") ALL 3,40:41,500:2000']
+
+        def fetch(self, message_set, fields):
+            assert message_set == "2000,1999,1998"
+            return "OK", [
+                (f"{seq} (BODY[HEADER.FIELDS (SUBJECT FROM DATE)] {{60}}".encode(), header)
+                for seq, header in (
+                    (1998, _header_bytes("Third", "a@example.com")),
+                    (1999, _header_bytes("Second", "a@example.com")),
+                    (2000, _header_bytes("First", "a@example.com")),
+                )
+            ]
+
+    monkeypatch.setattr(gmail_server, "_get_imap_connection", lambda: FakeMail())
+    result = await gmail_server.list_unread_emails(count=3)
+    assert result.index("ID: 2000") < result.index("ID: 1999") < result.index("ID: 1998")
+
+
+def test_newest_in_sequence_set():
+    newest = gmail_server._newest_in_sequence_set(b"1:5,9,12:14", 5)
+    assert newest == [b"5", b"9", b"12", b"13", b"14"]
+    assert gmail_server._newest_in_sequence_set(b"", 5) == []
+    assert gmail_server._esearch_all([b'(TAG "A7")']) == b""
+
+
+@pytest.mark.asyncio
+async def test_read_email_decodes_declared_charset(monkeypatch):
+    message = EmailMessage()
+    message["Subject"] = "Menu"
+    message["From"] = "chef@example.com"
+    message.set_content("Crème brûlée à la carte", charset="iso-8859-1", cte="quoted-printable")
+
+    class FakeMail:
+        def select(self, mailbox):
+            return "OK", [b""]
+
+        def fetch(self, email_id, fields):
+            return "OK", [(b"5 (RFC822)", message.as_bytes())]
+
+    monkeypatch.setattr(gmail_server, "_get_imap_connection", lambda: FakeMail())
+    result = await gmail_server.read_email("5")
+    assert "Crème brûlée à la carte" in result
+
+
+def test_decode_snippet_undoes_transfer_encoding_and_keeps_cut_characters_out():
+    headers = gmail_server._HEADER_PARSER.parsebytes(
+        b"Content-Type: text/plain; charset=utf-8\r\n"
+        b"Content-Transfer-Encoding: base64\r\n\r\n"
+    )
+    raw = base64.encodebytes("Résumé attached 日本".encode())
+    assert gmail_server._decode_snippet(raw, headers) == "Résumé attached 日本"
+    # A partial fetch may cut a multibyte character; it is dropped, not replaced.
+    assert gmail_server._decode_snippet("日本".encode()[:-1], None) == "日"
+    assert gmail_server._decode_text(b"caf\xe9", "no-such-charset") == "caf\ufffd"
+
+
+@pytest.mark.parametrize("charset", ["base64", "hex", "zip", "rot13"])
+def test_decode_text_ignores_non_text_codecs(charset):
+    assert gmail_server._decode_text("café".encode(), charset) == "café"
@@ -1,14 +1,32 @@
+from urllib.parse import quote_plus
+
 import pytest
 
 from chat_google.mcp_servers import maps_server
 
 
+@pytest.fixture(autouse=True)
+def _reset_api_key_cache():
+    maps_server._reset_credentials_cache()
+    yield
+    maps_server._reset_credentials_cache()
+
+
 def test_get_api_key_missing(monkeypatch):
     monkeypatch.delenv("GOOGLE_MAPS_API_KEY", raising=False)
     with pytest.raises(ValueError):
         maps_server._get_api_key()
 
 
+def test_get_api_key_is_read_once(monkeypatch):
+    assert maps_server._get_api_key() == "maps-test-key"
+    monkeypatch.setenv("GOOGLE_MAPS_API_KEY", "rotated-key")
+    assert maps_server._get_api_key() == "maps-test-key"
+
+    maps_server._reset_credentials_cache()
+    assert maps_server._get_api_key() == "rotated-key"
+
+
 @pytest.mark.asyncio
 async def test_search_places_text(monkeypatch):
     async def fake_request_json(path, params=None):
@@ -187,3 +205,90 @@ async def test_maps_tool_propagates_api_error(monkeypatch):
     monkeypatch.setattr(maps_server, "_request_json", fake_request_json)
     result = await maps_server.search_places_text("Tatsu")
     assert result == "Error: Google Maps API status REQUEST_DENIED - API key invalid"
+
+
+class _FakeMapsResponse:
+    status_code = 200
+    text = ""
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+@pytest.mark.asyncio
+async def test_request_json_uses_shared_client(monkeypatch):
+    calls = []
+
+    class FakeClient:
+        async def get(self, url, params=None):
+            calls.append((url, params))
+            return _FakeMapsResponse({"status": "OK", "results": []})
+
+    client = FakeClient()
+    monkeypatch.setattr(maps_server, "_get_http_client", lambda: client)
+    payload, err = await maps_server._request_json("/geocode/json", {"address": "Damrak"})
+    assert err is None
+    assert payload["status"] == "OK"
+    assert calls == [
+        (
+            "https://maps.googleapis.com/maps/api/geocode/json",
+            {"address": "Damrak", "key": "maps-test-key"},
+        )
+    ]
+
+
+def test_place_link_matches_quote_plus():
+    prefix = "https://www.google.com/maps/place/?q=place_id:"
+    for place_id in ("ChIJN1t_tDeuEmsRUsoyG83frY4", "GhIJ-a.b~c", "a b/c", "café", ""):
+        assert maps_server._place_link(place_id) == prefix + quote_plus(place_id)
+    assert maps_server._place_link("-") == "-"
+
+
+@pytest.mark.asyncio
+async def test_get_directions_sums_multi_leg_routes(monkeypatch):
+    async def fake_request_json(path, params=None):
+        return (
+            {
+                "routes": [
+                    {
+                        "summary": "A4",
+                        "legs": [
+                            {
+                                "start_address": "Leiden, Netherlands",
+                                "distance": {"value": 36000},
+                                "duration": {"value": 2100},
+                                "duration_in_traffic": {"value": 2700},
+                            },
+                            "unexpected",
+                            {
+                                "end_address": "Rotterdam Centraal, Netherlands",
+                                "distance": {"value": 4000},
+                                "duration": {"value": 300},
+                                "duration_in_traffic": None,
+                            },
+                        ],
+                    }
+                ]
+            },
+            None,
+        )
+
+    monkeypatch.setattr(maps_server, "_request_json", fake_request_json)
+    result = await maps_server.get_directions("Leiden", "Rotterdam Centraal")
+    assert "Distance: 40.0 km" in result
+    assert "Duration: 40m" in result
+    assert "Duration in traffic: 45m" in result
+    assert "To: Rotterdam Centraal, Netherlands" in result
+
+
+def test_format_helpers():
+    assert maps_server._format_distance(350, "metric") == "0.3 km"
+    assert maps_server._format_distance(1609, "imperial") == "1.0 mi"
+    assert maps_server._format_duration(3720) == "1h 2m"
+    assert maps_server._maps_directions_url("Den Haag", "Delft", "transit") == (
+        "https://www.google.com/maps/dir/?api=1"
+        "&origin=Den+Haag&destination=Delft&travelmode=transit"
+    )